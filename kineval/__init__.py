@@ -1,11 +1,32 @@
 from .types import *
+from .transforms import (
+    AxisAngleMatrix,
+    AxisAngleMatrices,
+    EulerTransform,
+    YawTransforms,
+)
 from .geometries import Box, Cylinder, Line, Plane, Sphere, Cone
 from .robot import Robot, Link, Joint
-from .world import World, Obstacle, Marker
+from .spheres import FitRobotSpheres
+from .world import World, Obstacle, ObstacleList, MarkerCloud, CollisionCache
 from .init_robot import InitRobot
 from .forward_kinematics import TraverseRobotFK
-from .collision import RobotConfiguration, IsCollision, IsPoseCollison
-from .rrt import RRTInfo, StepRRT
+from .fk_engine import FKEngine, GetFKEngine
+from .inverse_kinematics import IKInfo, StepIK
+from .collision import (
+    RobotConfiguration,
+    CollisionResult,
+    IsCollision,
+    IsPoseCollison,
+    IsPoseCollisionBatch,
+    IsSelfCollisionBatch,
+    PoseClearanceBatch,
+)
+from .batch_ik import SolveIKBatch
+from .path_smoothing import SmoothPath
+from .rrt import RRTInfo, RRTObserver, StepRRT, StepRRTBudget
+from .rrt_process import RRTProcess
+from .rrt_star import RRTStarInfo, StepRRTStar
 from .controls import (
     MoveRobot,
     TurnRobot,
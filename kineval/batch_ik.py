@@ -0,0 +1,288 @@
+from kineval import (
+    Robot,
+    Joint,
+    Vec,
+    Vec3,
+    VecN,
+    Mat3,
+    IntVec,
+    BoolVec,
+    FKEngine,
+    RobotConfiguration,
+)
+from kineval.inverse_kinematics import EndeffectorChain
+from kineval.nearest_neighbors import ConfigDifference, WrappedDimensions
+from concurrent.futures import Executor, ProcessPoolExecutor
+import numpy as np
+
+
+class IKBatchProblem:
+    """A picklable description of an IK problem that can be solved for many seeds at
+    once, in this process or in a worker process."""
+
+    def __init__(
+        self,
+        robot: Robot,
+        target_position: Vec3,
+        target_orientation: Mat3 | None = None,
+        endeffector_offset: Vec3 = None,
+        iterations: int = 100,
+        max_step: float = 0.2,
+        damping: float = 0.1,
+        tolerance: float = 1e-3,
+    ):
+        """Compiles the robot and its endeffector chain into arrays.
+
+        Args:
+            robot (Robot): Robot to solve IK for.
+            target_position (Vec3): World position to move the endeffector to.
+            target_orientation (Mat3 | None, optional): World rotation matrix to align
+                the endeffector with, or None to only solve for position. Defaults to
+                None.
+            endeffector_offset (Vec3, optional): Point on the endeffector (in its link
+                frame) to move to the target. Defaults to None (link origin).
+            iterations (int, optional): Damped least squares iterations per seed.
+                Defaults to 100.
+            max_step (float, optional): Maximum change of any joint in one iteration.
+                Defaults to 0.2.
+            damping (float, optional): Damping factor of damped least squares. Defaults
+                to 0.1.
+            tolerance (float, optional): Error norm at which a seed has converged.
+                Defaults to 1e-3.
+        """
+        self.engine: FKEngine = FKEngine(robot)  # batched forward kinematics
+        engine_index = {name: i for i, name in enumerate(self.engine.joint_names)}
+        chain = EndeffectorChain(robot)
+        parent = robot.endeffector.parent
+
+        # endeffector chain
+        self.chain: IntVec = np.array(
+            [engine_index[joint.name] for joint in chain], int
+        )  # engine index of each chain joint
+        self.columns: IntVec = self.engine.columns[self.chain]  # vector index of joints
+        self.lower: Vec = np.array(
+            [-np.inf if joint.limits is None else joint.limits[0] for joint in chain],
+            float,
+        )  # lower joint limits
+        self.upper: Vec = np.array(
+            [np.inf if joint.limits is None else joint.limits[1] for joint in chain],
+            float,
+        )  # upper joint limits
+        self.prismatic: BoolVec = np.array(
+            [joint.type == Joint.JointType.PRISMATIC for joint in chain], bool
+        )  # whether each chain joint slides instead of rotates
+        self.endeffector: int = (
+            -1 if parent is None else engine_index[parent.name]
+        )  # engine index of the endeffector's joint, -1 for the base
+        self.endeffector_offset: Vec3 = (
+            np.zeros((3), float)
+            if endeffector_offset is None
+            else np.array(endeffector_offset, float)
+        )
+
+        # target and solver settings
+        self.target_position: Vec3 = np.array(target_position, float)
+        self.target_orientation: Mat3 | None = (
+            None if target_orientation is None else np.array(target_orientation, float)
+        )
+        self.iterations: int = iterations
+        self.max_step: float = max_step
+        self.damping: float = damping
+        self.tolerance: float = tolerance
+
+
+def SampleIKSeeds(robot: Robot, n_seeds: int, rng: np.random.Generator = None) -> VecN:
+    """Samples configuration vectors with the endeffector chain drawn uniformly within
+    `Joint.limits` (or [-pi, pi] for continuous joints). Every other entry is taken
+    from the robot's current configuration.
+
+    Args:
+        robot (Robot): Robot to sample seeds for.
+        n_seeds (int): Number of seeds.
+        rng (np.random.Generator, optional): Random generator. Defaults to None.
+
+    Returns:
+        VecN: (n_seeds, dof) array of configuration vectors.
+    """
+    rng = np.random.default_rng() if rng is None else rng
+    seeds = np.tile(RobotConfiguration(robot).asVec(), (n_seeds, 1))
+    column = {joint.name: 3 + i for i, joint in enumerate(robot.joints)}
+    for joint in EndeffectorChain(robot):
+        lower, upper = (-np.pi, np.pi) if joint.limits is None else joint.limits
+        seeds[:, column[joint.name]] = rng.uniform(lower, upper, n_seeds)
+    return seeds
+
+
+def SolveIKBatch(
+    robot: Robot,
+    target_position: Vec3,
+    target_orientation: Mat3 | None = None,
+    seeds: int | VecN = 64,
+    return_all: bool = False,
+    executor: Executor | None = None,
+    processes: int | None = None,
+    chunk_size: int = 256,
+    rng: np.random.Generator = None,
+    **kwargs,
+) -> RobotConfiguration | list[RobotConfiguration] | None:
+    """Solves IK from many seeds and ranks the converged solutions by joint space
+    distance to the robot's current configuration, the short way around for continuous
+    joints, which are returned at their turn closest to the current configuration. Up
+    to `chunk_size` seeds are solved together in this process with a vectorized
+    Jacobian. Larger batches are split into chunks and solved in a process pool.
+
+    Args:
+        robot (Robot): Robot to solve IK for.
+        target_position (Vec3): World position to move the endeffector to.
+        target_orientation (Mat3 | None, optional): World rotation matrix to align the
+            endeffector with, or None to only solve for position. Defaults to None.
+        seeds (int | VecN, optional): Number of random seeds to sample with
+            `SampleIKSeeds`, or an (N, dof) array of seed configuration vectors.
+            Defaults to 64.
+        return_all (bool, optional): Whether to return every converged solution instead
+            of only the closest one. Defaults to False.
+        executor (Executor | None, optional): Pool to solve chunks in. Defaults to None
+            (a temporary process pool is created when needed).
+        processes (int | None, optional): Number of processes of the temporary pool.
+            Defaults to None (one per CPU).
+        chunk_size (int, optional): Number of seeds solved together. Defaults to 256.
+        rng (np.random.Generator, optional): Random generator for sampling seeds.
+            Defaults to None.
+        **kwargs: Solver settings passed to `IKBatchProblem`.
+
+    Returns:
+        RobotConfiguration | list[RobotConfiguration] | None: The closest converged
+            solution (None if no seed converged), or all converged solutions from
+            closest to furthest if `return_all`.
+    """
+    problem = IKBatchProblem(robot, target_position, target_orientation, **kwargs)
+    if isinstance(seeds, int):
+        seeds = SampleIKSeeds(robot, seeds, rng)
+    seeds = np.atleast_2d(np.asarray(seeds, float))
+
+    # solve small batches directly and fan large batches out to a pool
+    if len(seeds) <= chunk_size:
+        solutions, errors = SolveIKChunk(problem, seeds)
+    else:
+        chunks = [seeds[i : i + chunk_size] for i in range(0, len(seeds), chunk_size)]
+        problems = [problem] * len(chunks)
+        if executor is None:
+            with ProcessPoolExecutor(processes) as pool:
+                results = list(pool.map(SolveIKChunk, problems, chunks))
+        else:
+            results = list(executor.map(SolveIKChunk, problems, chunks))
+        solutions = np.concatenate([result[0] for result in results])
+        errors = np.concatenate([result[1] for result in results])
+
+    # rank converged solutions by distance to the current configuration, moving
+    # continuous joints to their turn closest to it
+    current = RobotConfiguration(robot).asVec()
+    differences = ConfigDifference(
+        current, solutions[errors <= problem.tolerance], WrappedDimensions(robot)
+    )
+    solutions = current + differences
+    order = np.argsort(np.linalg.norm(differences, axis=1))
+    ranked = [RobotConfiguration(robot).fromVec(solutions[i]) for i in order]
+    if return_all:
+        return ranked
+    return ranked[0] if ranked else None
+
+
+def SolveIKChunk(problem: IKBatchProblem, seeds: VecN) -> tuple[VecN, Vec]:
+    """Runs damped least squares IK on every seed at once, using a vectorized
+    Jacobian.
+
+    Args:
+        problem (IKBatchProblem): The IK problem.
+        seeds (VecN): (N, dof) array of configuration vectors to start from.
+
+    Returns:
+        tuple[VecN, Vec]: The (N, dof) solved configurations and their (N,) final
+            error norms.
+    """
+    configurations = np.array(seeds, float)
+    errors = np.full(len(configurations), np.inf)
+    rows = np.arange(len(configurations))
+    for iteration in range(problem.iterations + 1):
+        jacobians, residuals = ComputeIKBatch(problem, configurations[rows])
+        errors[rows] = np.linalg.norm(residuals, axis=1)
+
+        # only keep iterating on seeds that have not converged
+        unsolved = errors[rows] > problem.tolerance
+        if iteration == problem.iterations or not unsolved.any():
+            break
+        rows, jacobians, residuals = (
+            rows[unsolved],
+            jacobians[unsolved],
+            residuals[unsolved],
+        )
+
+        # damped least squares step: J^T (J J^T + lambda^2 I)^-1 e
+        jacobians_t = np.swapaxes(jacobians, 1, 2)
+        jjt = jacobians @ jacobians_t
+        jjt += problem.damping**2 * np.identity(jacobians.shape[1])
+        steps = (jacobians_t @ np.linalg.solve(jjt, residuals[..., np.newaxis]))[..., 0]
+        largest = np.max(np.abs(steps), axis=1, keepdims=True)
+        steps *= np.minimum(1.0, problem.max_step / np.maximum(largest, 1e-12))
+
+        # apply the step within the joint limits
+        index = np.ix_(rows, problem.columns)
+        configurations[index] = np.clip(
+            configurations[index] + steps, problem.lower, problem.upper
+        )
+    return configurations, errors
+
+
+def ComputeIKBatch(problem: IKBatchProblem, configurations: VecN) -> tuple[VecN, VecN]:
+    """Computes the geometric Jacobian and error of each configuration.
+
+    Args:
+        problem (IKBatchProblem): The IK problem.
+        configurations (VecN): (N, dof) array of configuration vectors.
+
+    Returns:
+        tuple[VecN, VecN]: The (N, m, n_chain) Jacobians and (N, m) errors, where m is 3
+            for position targets and 6 for pose targets.
+    """
+    engine = problem.engine
+    transforms = engine.compute(configurations)
+    base = engine.computeBase(configurations)
+    frame = (
+        base if problem.endeffector < 0 else transforms[:, problem.endeffector]
+    )  # (N, 4, 4) endeffector link frame
+    endeffector = frame[:, 0:3, 3] + frame[:, 0:3, 0:3] @ problem.endeffector_offset
+
+    # revolute columns: axis x (endeffector - joint)
+    joints = transforms[:, problem.chain]  # (N, C, 4, 4)
+    axes = engine.axes[problem.chain]
+    axes = axes / np.linalg.norm(axes, axis=1, keepdims=True)
+    world_axes = (joints[..., 0:3, 0:3] @ axes[..., np.newaxis])[..., 0]  # (N, C, 3)
+    linear = np.cross(world_axes, endeffector[:, np.newaxis] - joints[..., 0:3, 3])
+    angular = world_axes
+
+    # prismatic columns: axis in the parent link frame
+    if problem.prismatic.any():
+        chain = problem.chain[problem.prismatic]
+        parents = engine.parents[chain]
+        frames = np.where(
+            (parents < 0)[np.newaxis, :, np.newaxis, np.newaxis],
+            base[:, np.newaxis],
+            transforms[:, np.maximum(parents, 0)],
+        )
+        linear[:, problem.prismatic] = (
+            frames[..., 0:3, 0:3] @ engine.axes[chain][..., np.newaxis]
+        )[..., 0]
+        angular[:, problem.prismatic] = 0.0
+
+    errors = problem.target_position - endeffector
+    if problem.target_orientation is None:
+        return np.swapaxes(linear, 1, 2), errors
+    current = frame[:, 0:3, 0:3]
+    target = problem.target_orientation
+    orientation_errors = 0.5 * np.sum(
+        np.cross(np.swapaxes(current, 1, 2), target.T), axis=1
+    )
+    jacobians = np.concatenate([linear, angular], axis=2)
+    return np.swapaxes(jacobians, 1, 2), np.concatenate(
+        [errors, orientation_errors], axis=1
+    )
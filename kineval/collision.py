@@ -1,10 +1,24 @@
-from kineval import Robot, World, Link, Joint, Vec, Vec2, Mat4
+from kineval import (
+    Robot,
+    World,
+    Link,
+    Joint,
+    Vec,
+    Vec2,
+    VecN,
+    Mat4,
+    Mat4N,
+    Mat4NJ,
+    IntVec,
+    BoolVec,
+)
+from kineval import GetFKEngine
 
 # TODO: you may want to import other modules, such as numpy or scipy.spatial.transform
 
 # FIXME: remove instructor imports
 import numpy as np
-from scipy.spatial.transform import Rotation as R
+from kineval import AxisAngleMatrix, EulerTransform
 
 
 class RobotConfiguration:
@@ -71,35 +85,81 @@ class RobotConfiguration:
             joint.theta = self.joint_configs[joint.name]
 
 
-def IsCollision(robot: Robot, world: World) -> bool:
+class CollisionResult:
+    """A struct for storing what a collision query found. Queries stop at the first
+    colliding link, so at most one link is reported."""
+
+    def __init__(self):
+        self.collided: bool = False  # whether the robot is in collision
+        self.links: list[str] = []  # names of colliding links
+        self.obstacles: list[int] = []  # indices into world.obstacles of hit obstacles
+
+    def add(self, link: str, obstacles: IntVec | list[int] = ()):
+        """Records a colliding link and the obstacles it hits.
+
+        Args:
+            link (str): Name of the colliding link.
+            obstacles (IntVec | list[int], optional): Indices into world.obstacles of
+                the obstacles the link hits. Defaults to none.
+        """
+        self.collided = True
+        self.links.append(link)
+        self.obstacles.extend(int(i) for i in obstacles)
+
+
+def IsCollision(
+    robot: Robot, world: World, result: CollisionResult | None = None
+) -> bool:
     """Returns whether the robot is currently in collision.
 
     Args:
         robot (Robot): Robot to check collision for.
         world (World): World the robot is in.
+        result (CollisionResult | None, optional): Result to record the colliding link
+            and obstacles in. Defaults to None.
 
     Returns:
         bool: Whether the robot is in collision.
     """
     # NOTE: This function is already written for you
     configuration = RobotConfiguration(robot)  # get current configuration
-    return IsPoseCollison(robot, configuration, world)
+    return IsPoseCollison(robot, configuration, world, result)
 
 
 def IsPoseCollison(
-    robot: Robot, configuration: RobotConfiguration, world: World
+    robot: Robot,
+    configuration: RobotConfiguration,
+    world: World,
+    result: CollisionResult | None = None,
 ) -> bool:
     """Returns whether the robot in the given configuration is in collision. May call
-    `CollisionLinkFK` and `CollisionJointFK`.
+    `CollisionLinkFK` and `CollisionJointFK`. Only reads the robot, so it is safe to
+    call on configurations that are never displayed.
 
     Args:
         robot (Robot): Robot to check collision for.
         configuration (RobotConfiguration): Configuration to check against.
         world (World): World the robot is in.
+        result (CollisionResult | None, optional): Result to record the colliding link
+            and obstacles in. Defaults to None.
 
     Returns:
         bool: Whether the robot is in collision.
     """
+    # NOTE: Do NOT remove the following lines of code
+    # reuse cached results, a query that records a result always runs
+    if result is None and world.collision_cache is not None:
+        cache = world.collision_cache
+        world.refreshObstacles()  # clears the cache if the obstacles changed
+        if robot.self_collision and robot.allowed_collisions is None:
+            robot.allowed_collisions = ComputeAllowedCollisions(robot)
+        key = cache.keys(robot, configuration.asVec())[0]
+        collided = cache.get(key)
+        if collided is None:
+            collided = IsPoseCollison(robot, configuration, world, CollisionResult())
+            cache.put(key, collided)
+        return collided
+
     # check whether center of base is within bounds of the world
     robot_x, robot_y = configuration.base_position
     if (
@@ -108,9 +168,17 @@ def IsPoseCollison(
         or robot_y < world.bounds[1][0]
         or robot_y > world.bounds[1][1]
     ):
-        robot.base.bbox_geom.SetVisibility(True)
+        if result is not None:
+            result.add(robot.base.name)
         return True
-    robot.base.bbox_geom.SetVisibility(False)
+
+    # check the obstacles and whether any two links collide with one batched forward
+    # kinematics pass, which is cheaper than traversing every link
+    if robot.self_collision:
+        collided, link = IsPoseCollisionBatch(robot, configuration.asVec(), world, True)
+        if collided[0] and result is not None:
+            result.add(robot.links[link[0]].name)
+        return bool(collided[0])
 
     # TODO: YOUR CODE HERE
     # Finish the rest of the function by building the base mstack and resursively
@@ -118,14 +186,633 @@ def IsPoseCollison(
     # DO NOT modify any part of the robot when traversing
 
     # FIXME: remove instructor solution below
-    mstack = np.identity(4)
-    mstack[0:3, 0:3] = R.from_euler("Z", configuration.base_rotation).as_matrix()
-    mstack[0:2, 3] = configuration.base_position
-    return CollisionLinkFK(mstack, robot.base, configuration, world)
+    mstack = EulerTransform(
+        [*configuration.base_position, 0.0], [0.0, 0.0, configuration.base_rotation]
+    )
+    return CollisionLinkFK(mstack, robot.base, configuration, world, result=result)
+
+
+def IsPoseCollisionBatch(
+    robot: Robot,
+    configurations: VecN,
+    world: World,
+    return_links: bool = False,
+    chunk_size: int = 1024,
+) -> BoolVec | tuple[BoolVec, IntVec]:
+    """Returns whether the robot is in collision for each of many configurations, using
+    batched forward kinematics and vectorized box-sphere tests. Configurations with no
+    obstacle within reach of the robot skip forward kinematics entirely. Results are
+    read from and stored in `world.collision_cache` unless `return_links`.
+
+    Args:
+        robot (Robot): Robot to check collision for.
+        configurations (VecN): (N, dof) array of configuration vectors, in the
+            `RobotConfiguration.asVec` layout.
+        world (World): World the robot is in.
+        return_links (bool, optional): Whether to also return the first colliding link
+            of each configuration. Defaults to False.
+        chunk_size (int, optional): Number of configurations processed together.
+            Defaults to 1024.
+
+    Returns:
+        BoolVec | tuple[BoolVec, IntVec]: (N,) mask of configurations in collision and,
+            if `return_links`, the (N,) index into `robot.links` of the first colliding
+            link (-1 if not in collision).
+    """
+    configurations = np.atleast_2d(np.asarray(configurations, float))
+    if not return_links and world.collision_cache is not None:
+        # only check the configurations that are not cached
+        cache = world.collision_cache
+        world.refreshObstacles()  # clears the cache if the obstacles changed
+        if robot.self_collision and robot.allowed_collisions is None:
+            robot.allowed_collisions = ComputeAllowedCollisions(robot)
+        keys = cache.keys(robot, configurations)
+        cached = [cache.get(key) for key in keys]
+        collided = np.array([bool(hit) for hit in cached], bool)
+        misses = np.array([i for i, hit in enumerate(cached) if hit is None], int)
+        if len(misses) > 0:
+            collided[misses] = IsPoseCollisionBatch(
+                robot, configurations[misses], world, True, chunk_size
+            )[0]
+            for i in misses:
+                cache.put(keys[i], collided[i])
+        return collided
+
+    engine = GetFKEngine(robot)
+    links = np.full(len(configurations), -1, int)
+    if robot.base.reach is None:
+        ComputeReach(robot.base)
+    shapes = GetLinkShapes(robot)
+
+    # check whether center of base is within bounds of the world
+    x, y = configurations[:, 0], configurations[:, 1]
+    outside = (
+        (x < world.bounds[0][0])
+        | (x > world.bounds[0][1])
+        | (y < world.bounds[1][0])
+        | (y > world.bounds[1][1])
+    )
+    links[outside] = robot.links.index(robot.base)
+
+    for start in range(0, len(configurations), chunk_size):
+        rows = np.arange(start, min(start + chunk_size, len(configurations)))
+        rows = rows[~outside[rows]]
+        if len(rows) == 0:
+            continue
+
+        # pair configurations with the obstacles within reach of the robot
+        centers = np.zeros((len(rows), 3), float)
+        centers[:, 0:2] = configurations[rows, 0:2]
+        pair_rows, pair_obstacles = world.queryObstaclePairs(centers, robot.base.reach)
+        if len(pair_rows) == 0 and not robot.self_collision:
+            continue
+        active, pair_rows = np.unique(pair_rows, return_inverse=True)
+
+        # link frames of each configuration that may be in collision, the self
+        # collision test below needs them for every configuration
+        if robot.self_collision:
+            all_frames = engine.computeLinks(configurations[rows])
+            frames = all_frames[active]
+        else:
+            frames = engine.computeLinks(configurations[rows[active]])
+
+        # test every link against its paired obstacles, a block of pairs at a time
+        hits = np.zeros((len(active), len(robot.links)), bool)
+        block = max(1, chunk_size * 16 // len(robot.links))
+        for i in range(0, len(pair_rows), block):
+            obstacles = pair_obstacles[i : i + block]
+            distances = shapes.distances(
+                frames[pair_rows[i : i + block]],
+                world.obstacle_origins[obstacles],
+                world.obstacle_radii[obstacles],
+            )
+            np.logical_or.at(hits, pair_rows[i : i + block], distances <= 0.0)
+
+        collided = hits.any(axis=1)
+        links[rows[active[collided]]] = np.argmax(hits[collided], axis=1)
+
+        # check whether any two links collide in the remaining configurations
+        if robot.self_collision:
+            free = links[rows] < 0
+            links[rows[free]] = SelfCollisionLinks(robot, all_frames[free])
+
+    if return_links:
+        return links >= 0, links
+    return links >= 0
+
+
+def IsSelfCollisionBatch(
+    robot: Robot,
+    configurations: VecN,
+    return_links: bool = False,
+    chunk_size: int = 1024,
+) -> BoolVec | tuple[BoolVec, IntVec]:
+    """Returns whether any two links of the robot collide, for each of many
+    configurations. Link pairs in `robot.allowed_collisions` are skipped.
+
+    Args:
+        robot (Robot): Robot to check self collision for.
+        configurations (VecN): (N, dof) array of configuration vectors, in the
+            `RobotConfiguration.asVec` layout.
+        return_links (bool, optional): Whether to also return the first link of the
+            first colliding pair of each configuration. Defaults to False.
+        chunk_size (int, optional): Number of configurations processed together.
+            Defaults to 1024.
+
+    Returns:
+        BoolVec | tuple[BoolVec, IntVec]: (N,) mask of configurations in self collision
+            and, if `return_links`, the (N,) index into `robot.links` of a colliding
+            link (-1 if not in collision).
+    """
+    engine = GetFKEngine(robot)
+    configurations = np.atleast_2d(np.asarray(configurations, float))
+    links = np.full(len(configurations), -1, int)
+    for start in range(0, len(configurations), chunk_size):
+        rows = np.arange(start, min(start + chunk_size, len(configurations)))
+        links[rows] = SelfCollisionLinks(
+            robot, engine.computeLinks(configurations[rows])
+        )
+
+    if return_links:
+        return links >= 0, links
+    return links >= 0
+
+
+def SelfCollisionLinks(robot: Robot, frames: Mat4NJ) -> IntVec:
+    """Finds a colliding pair of links in each set of link frames. Link pairs in
+    `robot.allowed_collisions` are skipped.
+
+    Args:
+        robot (Robot): Robot to check self collision for.
+        frames (Mat4NJ): (N, L, 4, 4) link frames, in the order of `robot.links`.
+
+    Returns:
+        IntVec: (N,) index into `robot.links` of a colliding link (-1 if not in
+            collision).
+    """
+    links = np.full(len(frames), -1, int)
+    if robot.allowed_collisions is None:
+        robot.allowed_collisions = ComputeAllowedCollisions(robot)
+    pairs = np.argwhere(np.triu(~robot.allowed_collisions, 1))  # (K, 2) checked pairs
+    if len(pairs) > 0 and len(frames) > 0:
+        overlaps = GetLinkShapes(robot).overlaps(frames, pairs)
+        collided = overlaps.any(axis=1)
+        links[collided] = pairs[np.argmax(overlaps[collided], axis=1), 0]
+    return links
+
+
+def ComputeAllowedCollisions(
+    robot: Robot, n_samples: int = 1000, rng: np.random.Generator = None
+) -> np.ndarray:
+    """Builds the allowed collision matrix of the robot by sampling joint
+    configurations. Links joined by a joint, and pairs that collide in every sample or
+    in none of them, do not need to be checked.
+
+    Args:
+        robot (Robot): Robot to build the matrix for.
+        n_samples (int, optional): Number of sampled configurations. Defaults to 1000.
+        rng (np.random.Generator, optional): Random generator. Defaults to None.
+
+    Returns:
+        np.ndarray: (L, L) symmetric mask of link pairs that are never checked.
+    """
+    rng = np.random.default_rng(0) if rng is None else rng
+    index = {link.name: i for i, link in enumerate(robot.links)}
+    allowed = np.identity(len(robot.links), bool)
+    for joint in robot.joints:
+        allowed[index[joint.parent.name], index[joint.child.name]] = True
+        allowed[index[joint.child.name], index[joint.parent.name]] = True
+
+    # sample joints within their limits, the base does not matter
+    samples = np.zeros((n_samples, 3 + len(robot.joints)), float)
+    for i, joint in enumerate(robot.joints):
+        lower, upper = (-np.pi, np.pi) if joint.limits is None else joint.limits
+        samples[:, i + 3] = rng.uniform(lower, upper, n_samples)
+
+    pairs = np.argwhere(np.triu(~allowed, 1))
+    if len(pairs) > 0:
+        frames = GetFKEngine(robot).computeLinks(samples)
+        overlaps = GetLinkShapes(robot).overlaps(frames, pairs)
+        skipped = overlaps.all(axis=0) | ~overlaps.any(axis=0)
+        allowed[pairs[skipped, 0], pairs[skipped, 1]] = True
+        allowed[pairs[skipped, 1], pairs[skipped, 0]] = True
+    return allowed
+
+
+def PoseClearanceBatch(
+    robot: Robot,
+    configurations: VecN,
+    world: World,
+    max_distance: float = np.inf,
+    chunk_size: int = 1024,
+) -> VecN:
+    """Computes the signed distance between each link's bounding box and the nearest
+    obstacle, for each of many configurations. Distances are negative when the link
+    penetrates an obstacle. World bounds are ignored.
+
+    Args:
+        robot (Robot): Robot to compute clearances for.
+        configurations (VecN): (N, dof) array of configuration vectors, in the
+            `RobotConfiguration.asVec` layout.
+        world (World): World the robot is in.
+        max_distance (float, optional): Clearances above this are reported as inf,
+            which lets distant obstacles be skipped. Defaults to inf.
+        chunk_size (int, optional): Number of configurations processed together.
+            Defaults to 1024.
+
+    Returns:
+        VecN: (N, n_links) clearance of each link, in the order of `robot.links`.
+    """
+    engine = GetFKEngine(robot)
+    configurations = np.atleast_2d(np.asarray(configurations, float))
+    clearances = np.full((len(configurations), len(robot.links)), np.inf)
+    if robot.base.reach is None:
+        ComputeReach(robot.base)
+    shapes = GetLinkShapes(robot)
+
+    for start in range(0, len(configurations), chunk_size):
+        rows = np.arange(start, min(start + chunk_size, len(configurations)))
+
+        # pair configurations with the obstacles that can be within max_distance
+        if np.isfinite(max_distance):
+            centers = np.zeros((len(rows), 3), float)
+            centers[:, 0:2] = configurations[rows, 0:2]
+            pair_rows, pair_obstacles = world.queryObstaclePairs(
+                centers, robot.base.reach + max_distance
+            )
+        else:
+            pair_rows, pair_obstacles = np.indices(
+                (len(rows), len(world.obstacle_radii))
+            )
+            pair_rows, pair_obstacles = pair_rows.ravel(), pair_obstacles.ravel()
+        if len(pair_rows) == 0:
+            continue
+        active, pair_rows = np.unique(pair_rows, return_inverse=True)
+        frames = engine.computeLinks(configurations[rows[active]])
+
+        # keep the smallest distance of every link, a block of pairs at a time
+        nearest = np.full((len(active), len(robot.links)), np.inf)
+        block = max(1, chunk_size * 16 // len(robot.links))
+        for i in range(0, len(pair_rows), block):
+            obstacles = pair_obstacles[i : i + block]
+            distances = shapes.distances(
+                frames[pair_rows[i : i + block]],
+                world.obstacle_origins[obstacles],
+                world.obstacle_radii[obstacles],
+            )
+            np.minimum.at(nearest, pair_rows[i : i + block], distances)
+        clearances[rows[active]] = nearest
+
+    clearances[clearances > max_distance] = np.inf
+    return clearances
+
+
+def GetLinkShapes(robot: Robot) -> "LinkShapes":
+    """Returns the packed collision shapes of the robot, packing them on first use and
+    again whenever a link's bounds or spheres have been reassigned.
+
+    Args:
+        robot (Robot): The robot to get the shapes of.
+
+    Returns:
+        LinkShapes: The robot's link shapes.
+    """
+    if robot.link_shapes is None or not robot.link_shapes.isCurrent(robot):
+        robot.link_shapes = LinkShapes(robot)
+    return robot.link_shapes
+
+
+class LinkShapes:
+    """The collision shapes of every link of a robot, packed into arrays. A link is
+    bounded by its box and, if it has `spheres`, also by the union of its spheres. The
+    spheres cover the link volume (see `LoadLinkSpheres`), so testing both bounds
+    never misses a collision of the link itself."""
+
+    def __init__(self, robot: Robot):
+        """Packs the shapes of the links.
+
+        Args:
+            robot (Robot): Robot to pack the link shapes of.
+        """
+        self.lower: VecN = np.array(
+            [link.bbox[::2] for link in robot.links], float
+        )  # (L, 3) lower box corners
+        self.upper: VecN = np.array(
+            [link.bbox[1::2] for link in robot.links], float
+        )  # (L, 3) upper box corners
+        spheres = [
+            (i, sphere)
+            for i, link in enumerate(robot.links)
+            if link.spheres is not None
+            for sphere in link.spheres
+        ]
+        self.sphere_links: IntVec = np.array(
+            [i for i, _ in spheres], int
+        )  # (S,) link index of each sphere
+        self.spheres: VecN = np.array([sphere for _, sphere in spheres], float).reshape(
+            -1, 4
+        )  # (S, 4) sphere centers and radii in their link frames
+        self.has_spheres: BoolVec = np.isin(
+            np.arange(len(robot.links)), self.sphere_links
+        )  # whether each link has spheres
+        self.sources: list[tuple[Vec, VecN | None]] = [
+            (link.bbox, link.spheres) for link in robot.links
+        ]  # bounds and spheres of each link that the shapes were packed from
+
+    def isCurrent(self, robot: Robot) -> bool:
+        """Returns whether the shapes were packed from the robot's current link bounds
+        and spheres. Reassigning `Link.bbox` or `Link.spheres` makes them stale.
+
+        Args:
+            robot (Robot): Robot the shapes were packed from.
+
+        Returns:
+            bool: Whether the shapes are up to date.
+        """
+        return len(self.sources) == len(robot.links) and all(
+            bbox is link.bbox and spheres is link.spheres
+            for (bbox, spheres), link in zip(self.sources, robot.links)
+        )
+
+    def distances(self, frames: Mat4NJ, origins: VecN, radii: Vec) -> VecN:
+        """Computes the signed distance between every link and one obstacle per
+        set of link frames. With spheres, the larger of the box and sphere distance is
+        used, since the link lies within both.
+
+        Args:
+            frames (Mat4NJ): (P, L, 4, 4) link frames.
+            origins (VecN): (P, 3) obstacle centers.
+            radii (Vec): (P,) obstacle radii.
+
+        Returns:
+            VecN: (P, L) signed distances.
+        """
+        distances = BoxSphereDistances(
+            frames,
+            self.lower,
+            self.upper,
+            origins[:, np.newaxis],
+            radii[:, np.newaxis],
+        )
+        if len(self.spheres) == 0:
+            return distances
+
+        # distance to the nearest sphere of each link
+        sphere_frames = frames[:, self.sphere_links]  # (P, S, 4, 4)
+        centers = (sphere_frames[..., 0:3, 0:3] @ self.spheres[:, 0:3, np.newaxis])[
+            ..., 0
+        ] + sphere_frames[..., 0:3, 3]
+        gaps = (
+            np.linalg.norm(centers - origins[:, np.newaxis], axis=-1)
+            - self.spheres[:, 3]
+            - radii[:, np.newaxis]
+        )
+        nearest = np.full(distances.shape, np.inf)
+        np.minimum.at(nearest, (slice(None), self.sphere_links), gaps)
+        return np.where(self.has_spheres, np.maximum(distances, nearest), distances)
+
+    def overlaps(self, frames: Mat4NJ, pairs: IntVec) -> np.ndarray:
+        """Returns whether pairs of links overlap. Pairs where both links have
+        spheres must also overlap in a pair of spheres.
+
+        Args:
+            frames (Mat4NJ): (N, L, 4, 4) link frames.
+            pairs (IntVec): (K, 2) indices of link pairs.
+
+        Returns:
+            np.ndarray: (N, K) mask of overlapping pairs.
+        """
+        first, second = pairs[:, 0], pairs[:, 1]
+
+        # only test boxes whose bounding spheres overlap
+        centers = (
+            frames[..., 0:3, 0:3] @ ((self.lower + self.upper) / 2)[..., np.newaxis]
+        )[..., 0] + frames[..., 0:3, 3]
+        radii = np.linalg.norm(self.upper - self.lower, axis=1) / 2
+        gaps = np.linalg.norm(centers[:, first] - centers[:, second], axis=-1)
+        rows, candidates = np.nonzero(gaps <= radii[first] + radii[second])
+
+        overlaps = np.zeros((len(frames), len(pairs)), bool)
+        overlaps[rows, candidates] = BoxBoxOverlaps(
+            frames[rows, first[candidates]],
+            self.lower[first[candidates]],
+            self.upper[first[candidates]],
+            frames[rows, second[candidates]],
+            self.lower[second[candidates]],
+            self.upper[second[candidates]],
+        )
+
+        # refine pairs of links that both have spheres
+        for k in np.flatnonzero(self.has_spheres[first] & self.has_spheres[second]):
+            spheres_a = self.spheres[self.sphere_links == first[k]]
+            spheres_b = self.spheres[self.sphere_links == second[k]]
+            centers_a = (
+                spheres_a[:, 0:3] @ np.swapaxes(frames[:, first[k], 0:3, 0:3], 1, 2)
+                + frames[:, first[k], np.newaxis, 0:3, 3]
+            )  # (N, Sa, 3)
+            centers_b = (
+                spheres_b[:, 0:3] @ np.swapaxes(frames[:, second[k], 0:3, 0:3], 1, 2)
+                + frames[:, second[k], np.newaxis, 0:3, 3]
+            )  # (N, Sb, 3)
+            gaps = np.linalg.norm(
+                centers_a[:, :, np.newaxis] - centers_b[:, np.newaxis], axis=-1
+            )
+            limits = spheres_a[:, 3, np.newaxis] + spheres_b[:, 3]
+            overlaps[:, k] &= np.any(gaps <= limits, axis=(1, 2))
+        return overlaps
+
+
+def BoxBoxOverlaps(
+    frames_a: Mat4N,
+    lower_a: VecN,
+    upper_a: VecN,
+    frames_b: Mat4N,
+    lower_b: VecN,
+    upper_b: VecN,
+) -> BoolVec:
+    """Returns whether oriented boxes overlap, using the separating axis theorem. All
+    arguments broadcast against each other.
+
+    Args:
+        frames_a (Mat4N): (..., 4, 4) transforms of the first box frames.
+        lower_a (VecN): (..., 3) lower corners of the first boxes, in their frames.
+        upper_a (VecN): (..., 3) upper corners of the first boxes, in their frames.
+        frames_b (Mat4N): (..., 4, 4) transforms of the second box frames.
+        lower_b (VecN): (..., 3) lower corners of the second boxes, in their frames.
+        upper_b (VecN): (..., 3) upper corners of the second boxes, in their frames.
+
+    Returns:
+        BoolVec: (...) mask of overlapping boxes.
+    """
+    axes_a = frames_a[..., 0:3, 0:3]
+    axes_b = frames_b[..., 0:3, 0:3]
+    half_a = (upper_a - lower_a) / 2
+    half_b = (upper_b - lower_b) / 2
+    center_a = (axes_a @ ((lower_a + upper_a) / 2)[..., np.newaxis])[..., 0]
+    center_b = (axes_b @ ((lower_b + upper_b) / 2)[..., np.newaxis])[..., 0]
+    offset = center_b + frames_b[..., 0:3, 3] - center_a - frames_a[..., 0:3, 3]
+    axes_a, axes_b, offset = np.broadcast_arrays(
+        axes_a, axes_b, offset[..., np.newaxis]
+    )
+
+    # candidate separating axes: the face normals of both boxes and their cross products
+    normals_a = np.swapaxes(axes_a, -1, -2)  # rows are axes
+    normals_b = np.swapaxes(axes_b, -1, -2)
+    edges = np.cross(normals_a[..., :, np.newaxis, :], normals_b[..., np.newaxis, :, :])
+    candidates = np.concatenate(
+        [normals_a, normals_b, edges.reshape(*edges.shape[:-3], 9, 3)], axis=-2
+    )  # (..., 15, 3)
+
+    # boxes are separated if their projections on any axis do not overlap
+    distance = np.abs(candidates @ offset)[..., 0]
+    extent_a = np.sum(np.abs(candidates @ axes_a) * half_a[..., np.newaxis, :], axis=-1)
+    extent_b = np.sum(np.abs(candidates @ axes_b) * half_b[..., np.newaxis, :], axis=-1)
+    return ~np.any(distance > extent_a + extent_b + 1e-9, axis=-1)
+
+
+def BoxSphereDistances(
+    frames: Mat4N, lower: VecN, upper: VecN, origins: VecN, radii: Vec
+) -> Vec:
+    """Computes the signed distance between boxes and spheres, negative when they
+    overlap. All arguments broadcast against each other.
+
+    Args:
+        frames (Mat4N): (..., 4, 4) transforms of the box frames.
+        lower (VecN): (..., 3) lower corners of the boxes, in their frames.
+        upper (VecN): (..., 3) upper corners of the boxes, in their frames.
+        origins (VecN): (..., 3) world centers of the spheres.
+        radii (Vec): (...) radii of the spheres.
+
+    Returns:
+        Vec: (...) signed distances.
+    """
+    # transform sphere origins to box frames, R^T (origin - t)
+    origins_local = np.einsum(
+        "...j,...jk->...k", origins - frames[..., 0:3, 3], frames[..., 0:3, 0:3]
+    )
+    # distance to the closest point on the box, zero inside the box
+    closest = np.clip(origins_local, lower, upper)
+    outside = np.linalg.norm(closest - origins_local, axis=-1)
+    # depth inside the box is the distance to its nearest face
+    inside = np.min(np.minimum(origins_local - lower, upper - origins_local), axis=-1)
+    return np.where(outside > 0.0, outside, -np.maximum(inside, 0.0)) - radii
+
+
+def IsEdgeCollision(
+    robot: Robot, start: Vec, end: Vec, world: World, resolution: float = 0.1
+) -> bool:
+    """Returns whether the robot collides anywhere on the straight line between two
+    configuration vectors. `start` is assumed to be collision free. `end` is checked
+    first, then the midpoint, the quarter points and so on, until no point on the robot
+    moves more than `resolution` between checked configurations.
+
+    Args:
+        robot (Robot): Robot to check collision for.
+        start (Vec): Configuration vector at the start of the edge.
+        end (Vec): Configuration vector at the end of the edge.
+        world (World): World the robot is in.
+        resolution (float, optional): Largest distance any point on the robot may move
+            between checked configurations. Defaults to 0.1.
+
+    Returns:
+        bool: Whether the edge is in collision.
+    """
+    start = np.asarray(start, float)
+    end = np.asarray(end, float)
+    if IsPoseCollisionBatch(robot, end, world)[0]:
+        return True
+
+    # check each level of bisection together, stopping at the first collision
+    segments = np.ceil(MaxDisplacement(robot, end - start) / resolution)
+    divisions = 1
+    while divisions < segments:
+        divisions *= 2
+        t = np.arange(1, divisions, 2)[:, np.newaxis] / divisions
+        if IsPoseCollisionBatch(robot, start + t * (end - start), world).any():
+            return True
+    return False
+
+
+def MaxDisplacement(robot: Robot, delta: Vec) -> float:
+    """Bounds how far any point on the robot moves when its configuration vector is
+    linearly interpolated by `delta`.
+
+    Args:
+        robot (Robot): Robot to bound the motion of.
+        delta (Vec): Change in the configuration vector.
+
+    Returns:
+        float: Upper bound on the displacement of any point on the robot.
+    """
+    if robot.base.reach is None:
+        ComputeReach(robot.base)
+    thetas = {
+        joint.name: abs(delta[i + 3]) for i, joint in enumerate(robot.joints)
+    }  # change of each joint
+    base = np.linalg.norm(delta[0:2]) + abs(delta[2]) * robot.base.reach
+    return base + SubtreeDisplacement(robot.base, thetas)
+
+
+def SubtreeDisplacement(link: Link, thetas: dict[str, float]) -> float:
+    """Bounds how far any point on the descendants of a link moves relative to the
+    link, when its descendant joints change by at most `thetas`.
+
+    Args:
+        link (Link): Root of the subtree.
+        thetas (dict[str, float]): Mapping of joint name to absolute change in theta.
+
+    Returns:
+        float: Upper bound on the displacement of any point in the subtree.
+    """
+    largest = 0.0
+    for joint in link.children:
+        if joint.type == Joint.JointType.FIXED:
+            own = 0.0
+        elif joint.type == Joint.JointType.PRISMATIC:
+            own = thetas[joint.name] * np.linalg.norm(joint.axis)
+        else:
+            # no point is further than the reach from the rotation axis
+            own = thetas[joint.name] * joint.child.reach
+        largest = max(largest, own + SubtreeDisplacement(joint.child, thetas))
+    return largest
+
+
+def ComputeReach(link: Link) -> float:
+    """Computes `reach` for the link and its descendants. The reach is the radius of
+    a sphere around the link origin that contains the link bounds and the bounds of
+    every descendant in any joint configuration.
+
+    Args:
+        link (Link): Root of the subtree to compute the reach of.
+
+    Returns:
+        float: The reach of the link.
+    """
+    # NOTE: This function is already written for you
+    corners = np.stack(np.meshgrid(link.bbox[0:2], link.bbox[2:4], link.bbox[4:6]))
+    reach = np.max(np.linalg.norm(corners.reshape(3, -1), axis=0))
+    for joint in link.children:
+        # rotations do not move points further from the joint origin
+        if joint.type != Joint.JointType.PRISMATIC:
+            offset = np.linalg.norm(joint.xyz)
+        elif joint.limits is None:
+            offset = float("inf")
+        else:
+            offset = max(
+                np.linalg.norm(joint.xyz + joint.axis * t) for t in joint.limits
+            )
+        reach = max(reach, offset + ComputeReach(joint.child))
+    link.reach = reach
+    return reach
 
 
 def CollisionJointFK(
-    mstack: Mat4, joint: Joint, configuration: RobotConfiguration, world: World
+    mstack: Mat4,
+    joint: Joint,
+    configuration: RobotConfiguration,
+    world: World,
+    nearby: IntVec | None = None,
+    result: CollisionResult | None = None,
 ) -> bool:
     """Checks whether the joint's descendants are in collision. Updates mstack and calls
     `CollisionLinkFK` for the child link.
@@ -135,6 +822,10 @@ def CollisionJointFK(
         joint (Joint): Joint to traverse.
         configuration (RobotConfiguration): Configuration to check against.
         world (World): World the robot is in.
+        nearby (IntVec | None, optional): Indices of the only obstacles that can touch
+            the joint's descendants. Defaults to None (all obstacles).
+        result (CollisionResult | None, optional): Result to record the colliding link
+            and obstacles in. Defaults to None.
 
     Returns:
         bool: Whether the joint's descendants are in collision.
@@ -144,26 +835,26 @@ def CollisionJointFK(
     # DO NOT modify any part of the robot when traversing
 
     # FIXME: remove instructor solution below
-    m = np.identity(4)
-    m[0:3, 0:3] = R.from_euler("XYZ", np.array(joint.rpy)).as_matrix()
-    m[0:3, 3] = joint.xyz
+    m = np.copy(joint.origin)
 
     # apply joint configuration
     theta = configuration.joint_configs[joint.name]
-    q = np.identity(4)
     if joint.type == Joint.JointType.PRISMATIC:
         m[0:3, 3] += joint.axis * theta
     else:
-        quat = [*(np.sin(theta / 2) * joint.axis), np.cos(theta / 2)]
-        q[0:3, 0:3] = R.from_quat(quat).as_matrix()
-    m = m @ q
+        m[0:3, 0:3] = m[0:3, 0:3] @ AxisAngleMatrix(joint.axis, theta)
 
     mstack = mstack @ m
-    return CollisionLinkFK(mstack, joint.child, configuration, world)
+    return CollisionLinkFK(mstack, joint.child, configuration, world, nearby, result)
 
 
 def CollisionLinkFK(
-    mstack: Mat4, link: Link, configuration: RobotConfiguration, world: World
+    mstack: Mat4,
+    link: Link,
+    configuration: RobotConfiguration,
+    world: World,
+    nearby: IntVec | None = None,
+    result: CollisionResult | None = None,
 ) -> bool:
     """Checks whether the link or its descendants are in collision. Calls
     `CollisionJointFK` for the children joints.
@@ -173,34 +864,47 @@ def CollisionLinkFK(
         link (Link): Link to traverse.
         configuration (RobotConfiguration): Configuration to check against.
         world (World): World the robot is in.
+        nearby (IntVec | None, optional): Indices of the only obstacles that can touch
+            the link or its descendants. Defaults to None (all obstacles).
+        result (CollisionResult | None, optional): Result to record the colliding link
+            and obstacles in. Defaults to None.
 
     Returns:
         bool: Whether the link or its descendants are in collision.
     """
     # NOTE: This function is already written for you
-    # calculate affine inverse
-    inverse_transform = np.identity(4)
-    R_T = np.transpose(mstack[:3, :3])
-    inverse_transform[:3, :3] = R_T
-    inverse_transform[:3, 3] = -R_T @ mstack[:3, 3]
-
-    # check collision of this link
-    for obstacle in world.obstacles:
-        # transform obstacle origin to link frame
-        origin_local = (inverse_transform @ obstacle.origin_homogeneous)[:3]
-        # find closest point on box to obstacle
-        closest = np.clip(origin_local, link.bbox[::2], link.bbox[1::2])
-        # check if distance is less than radius (in collision)
-        difference = closest - origin_local
-        if np.dot(difference, difference) <= obstacle.radius * obstacle.radius:
-            link.bbox_geom.SetVisibility(True)
-            return True
-        # not in collision
-        link.bbox_geom.SetVisibility(False)
+    # skip the whole subtree if no obstacle is within reach of it
+    if link.reach is None:
+        ComputeReach(link)
+    nearby = world.queryObstacles(mstack[:3, 3], link.reach, nearby)
+    if len(nearby) == 0:
+        return False
+
+    origins = world.obstacle_origins[nearby]
+    radii = world.obstacle_radii[nearby]
+    # transform obstacle origins to link frame, R^T (origin - t)
+    origins_local = (origins - mstack[:3, 3]) @ mstack[:3, :3]
+    # find closest point on box to each obstacle
+    closest = np.clip(origins_local, link.bbox[::2], link.bbox[1::2])
+    # check if any distance is less than its radius (in collision)
+    difference = closest - origins_local
+    distances = np.einsum("ij,ij->i", difference, difference)
+    hits = distances <= radii * radii
+    if link.spheres is not None and np.any(hits):
+        # the obstacle must also touch one of the link's bounding spheres
+        centers = link.spheres[:, 0:3] @ mstack[:3, :3].T + mstack[:3, 3]
+        gaps = np.linalg.norm(origins[hits, np.newaxis] - centers, axis=2)
+        hits[hits] = np.any(
+            gaps <= radii[hits, np.newaxis] + link.spheres[:, 3], axis=1
+        )
+    if np.any(hits):
+        if result is not None:
+            result.add(link.name, nearby[hits])
+        return True
 
     # recurse to child joints
     for joint in link.children:
-        if CollisionJointFK(np.copy(mstack), joint, configuration, world):
+        if CollisionJointFK(mstack, joint, configuration, world, nearby, result):
             return True
 
     # no collision in any of its descendants
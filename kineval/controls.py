@@ -1,4 +1,5 @@
 from kineval import Robot, Joint, Vec3, Vec2, RobotConfiguration, RRTInfo
+from kineval.nearest_neighbors import ConfigDifference
 from scipy.spatial.transform import Rotation as R
 import numpy as np
 
@@ -125,12 +126,12 @@ def TraversePathPlan(rrt: RRTInfo, target_i: int, direction: int, speed: float)
 
     # move towards target
     qcurrent_vec = RobotConfiguration(rrt.robot).asVec()
-    qtarget = rrt.path[target_i].configuration
-    qtarget_vec = qtarget.asVec()
-    dist = np.linalg.norm(qcurrent_vec - qtarget_vec)
+    qtarget = RobotConfiguration(rrt.robot).fromVec(rrt.path[target_i])
+    qdelta = ConfigDifference(qcurrent_vec, rrt.path[target_i], rrt.wrapped)
+    dist = np.linalg.norm(qdelta)
     if dist > speed:
         RobotConfiguration(rrt.robot).fromVec(
-            qcurrent_vec + (qtarget_vec - qcurrent_vec) * speed / dist
+            qcurrent_vec + qdelta * speed / dist
         ).useConfiguration(rrt.robot)
         return target_i
     else:
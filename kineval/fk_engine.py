@@ -0,0 +1,173 @@
+from kineval import Robot, Joint, IntVec, BoolVec, VecN, Mat4N, Mat4NJ
+from kineval.transforms import AxisAngleMatrices, YawTransforms
+import numpy as np
+
+
+class FKEngine:
+    """A compiled forward kinematics engine for evaluating many robot configurations
+    at once. Configurations use the `RobotConfiguration.asVec` layout."""
+
+    def __init__(self, robot: Robot):
+        """Flattens the kinematic tree of the robot into arrays. Joints are stored in
+        topological order (every joint comes after its parent joint) and grouped by
+        their depth in the tree so each depth can be evaluated in a single pass.
+
+        Args:
+            robot (Robot): The robot to compile. Must be initialized with `InitRobot`.
+        """
+        # order joints breadth first so parents always come before children
+        order: list[Joint] = []
+        levels: list[list[int]] = []
+        frontier = list(robot.base.children)
+        while frontier:
+            levels.append(list(range(len(order), len(order) + len(frontier))))
+            order.extend(frontier)
+            frontier = [joint for parent in frontier for joint in parent.child.children]
+        joint_index = {joint.name: i for i, joint in enumerate(order)}
+        column = {joint.name: 3 + i for i, joint in enumerate(robot.joints)}
+
+        # structure
+        self.joint_names: list[str] = [joint.name for joint in order]  # joint order
+        self.n_joints: int = len(order)  # number of joints
+        self.dof: int = 3 + len(robot.joints)  # length of a configuration vector
+        self.columns: IntVec = np.array(
+            [column[joint.name] for joint in order], int
+        )  # configuration vector index of each joint
+        self.parents: IntVec = np.array(
+            [
+                (
+                    -1
+                    if joint.parent.parent is None
+                    else joint_index[joint.parent.parent.name]
+                )
+                for joint in order
+            ],
+            int,
+        )  # index of each joint's parent joint, -1 if attached to the base
+        self.levels: list[IntVec] = [
+            np.array(level, int) for level in levels
+        ]  # joint indices grouped by depth
+        self.link_names: list[str] = [link.name for link in robot.links]  # link order
+        self.link_joints: IntVec = np.array(
+            [
+                -1 if link.parent is None else joint_index[link.parent.name]
+                for link in robot.links
+            ],
+            int,
+        )  # index of the joint each link is attached to, -1 for the base
+
+        # static joint properties
+        self.origins: Mat4N = np.array(
+            [joint.origin for joint in order], float
+        ).reshape(
+            -1, 4, 4
+        )  # static transform of each joint relative to its parent
+        self.axes: VecN = np.array([joint.axis for joint in order], float).reshape(
+            -1, 3
+        )  # joint axes
+        self.prismatic: BoolVec = np.array(
+            [joint.type == Joint.JointType.PRISMATIC for joint in order], bool
+        )  # whether each joint slides instead of rotates
+        self.fixed: BoolVec = np.array(
+            [joint.type == Joint.JointType.FIXED for joint in order], bool
+        )  # whether each joint is fixed
+
+    def computeBase(self, configurations: VecN) -> Mat4N:
+        """Computes the base transform of each configuration. The base sits on the
+        ground plane, as in `IsPoseCollison`.
+
+        Args:
+            configurations (VecN): (N, dof) array of configuration vectors.
+
+        Returns:
+            Mat4N: (N, 4, 4) array of base transforms.
+        """
+        configurations = self.__validate(configurations)
+        return YawTransforms(configurations[:, 0:2], configurations[:, 2])
+
+    def compute(self, configurations: VecN) -> Mat4NJ:
+        """Computes the world transform of every joint for each configuration. Joint
+        limits are not applied.
+
+        Args:
+            configurations (VecN): (N, dof) array of configuration vectors.
+
+        Returns:
+            Mat4NJ: (N, n_joints, 4, 4) array of joint transforms, with joints in the
+                order of `self.joint_names`.
+        """
+        configurations = self.__validate(configurations)
+        n = len(configurations)
+        thetas = np.where(self.fixed, 0.0, configurations[:, self.columns])  # (N, J)
+        angles = np.where(self.prismatic, 0.0, thetas)
+        offsets = np.where(self.prismatic, thetas, 0.0)
+
+        # transform of each joint relative to its parent link
+        local = np.empty((n, self.n_joints, 4, 4), float)
+        local[:] = self.origins
+        local[..., 0:3, 0:3] = self.origins[:, 0:3, 0:3] @ AxisAngleMatrices(
+            self.axes, angles
+        )
+        local[..., 0:3, 3] += self.axes * offsets[..., np.newaxis]
+
+        # chain the transforms one depth at a time
+        transforms = np.empty((n, self.n_joints, 4, 4), float)
+        base = YawTransforms(configurations[:, 0:2], configurations[:, 2])
+        for depth, level in enumerate(self.levels):
+            parent = (
+                base[:, np.newaxis]
+                if depth == 0
+                else transforms[:, self.parents[level]]
+            )
+            transforms[:, level] = parent @ local[:, level]
+        return transforms
+
+    def computeLinks(self, configurations: VecN) -> Mat4NJ:
+        """Computes the world transform of every link for each configuration. A link's
+        frame is the transform of the joint it is attached to, or the base transform.
+
+        Args:
+            configurations (VecN): (N, dof) array of configuration vectors.
+
+        Returns:
+            Mat4NJ: (N, n_links, 4, 4) array of link transforms, with links in the
+                order of `self.link_names`.
+        """
+        frames = np.concatenate(
+            [
+                self.computeBase(configurations)[:, np.newaxis],
+                self.compute(configurations),
+            ],
+            axis=1,
+        )  # base first, then joints
+        return frames[:, self.link_joints + 1]
+
+    def __validate(self, configurations: VecN) -> VecN:
+        """Ensures the configurations are a (N, dof) float array.
+
+        Args:
+            configurations (VecN): Configuration vector or array of vectors.
+
+        Returns:
+            VecN: (N, dof) array of configuration vectors.
+        """
+        configurations = np.atleast_2d(np.asarray(configurations, float))
+        if configurations.ndim != 2 or configurations.shape[1] != self.dof:
+            raise ValueError(
+                f"Invalid configurations. Expected an array of shape (N, {self.dof})."
+            )
+        return configurations
+
+
+def GetFKEngine(robot: Robot) -> FKEngine:
+    """Returns the compiled FKEngine of the robot, compiling it on first use.
+
+    Args:
+        robot (Robot): The robot to get the engine of.
+
+    Returns:
+        FKEngine: The robot's engine.
+    """
+    if robot.fk_engine is None:
+        robot.fk_engine = FKEngine(robot)
+    return robot.fk_engine
@@ -4,12 +4,14 @@ from kineval import Robot, Link, Joint, Mat4
 
 # FIXME: remove instructor imports
 import numpy as np
-from scipy.spatial.transform import Rotation as R
+from kineval import AxisAngleMatrix, EulerTransform
 
 
 def TraverseRobotFK(robot: Robot):
     """Traverses the robot kinematic chain and sets the `transform` property of the
-    robot and the joints. May call `TraverseLinkFK` and `TraverseJointFK`.
+    robot and the joints. May call `TraverseLinkFK` and `TraverseJointFK`. Only joints
+    whose `theta` changed since the last call, or which are below such a joint or a
+    moved base, are recomputed.
 
     Args:
         robot (Robot): The robot to do forward kinematics on.
@@ -18,56 +20,75 @@ def TraverseRobotFK(robot: Robot):
     # Build the base mstack and recursively call `TraverseLinkFK` and `TraverseJointFK`
 
     # FIXME: remove instructor solution below
-    mstack = np.identity(4)
-    mstack[0:3, 0:3] = R.from_euler("XYZ", np.array(robot.rpy)).as_matrix()
-    mstack[0:3, 3] = robot.xyz
-    robot.transform = mstack
-    TraverseLinkFK(mstack, robot.base)
+    dirty = not (
+        robot.fk_xyz is not None
+        and np.array_equal(robot.xyz, robot.fk_xyz)
+        and np.array_equal(robot.rpy, robot.fk_rpy)
+    )
+
+    # nothing has moved since the last update
+    if not dirty and all(joint.theta == joint.fk_theta for joint in robot.joints):
+        return
+
+    # base has moved, so every joint needs to be recomputed
+    if dirty:
+        robot.transform = EulerTransform(robot.xyz, robot.rpy)
+        robot.fk_xyz = np.copy(robot.xyz)
+        robot.fk_rpy = np.copy(robot.rpy)
+    TraverseLinkFK(robot.transform, robot.base, dirty)
 
 
-def TraverseLinkFK(mstack: Mat4, link: Link):
+def TraverseLinkFK(mstack: Mat4, link: Link, dirty: bool = False):
     """Helper function to traverse a link during FK.
 
     Args:
         mstack (Mat4D): Current transformation matrix on stack.
         link (Link): Link to traverse.
+        dirty (bool, optional): Whether `mstack` changed since the last update.
+            Defaults to False.
     """
     # TODO: YOUR CODE HERE
     # Call `TraverseJointFK` for the child joints
 
     # FIXME: remove instructor solution below
     for joint in link.children:
-        TraverseJointFK(np.copy(mstack), joint)
+        TraverseJointFK(mstack, joint, dirty)
 
 
-def TraverseJointFK(mstack: Mat4, joint: Joint):
+def TraverseJointFK(mstack: Mat4, joint: Joint, dirty: bool = False):
     """Helper function to traverse a joint during FK. May call `ApplyJointLimits`.
+    The joint transform is only recomputed if `dirty` or if the joint's `theta`
+    changed since the last update.
 
     Args:
         mstack (Mat4D): Current transformation matrix on stack.
         joint (Joint): Joint to traverse.
+        dirty (bool, optional): Whether `mstack` changed since the last update.
+            Defaults to False.
     """
     # TODO: YOUR CODE HERE
     # Update the mstack and call `TraverseLinkFK` for the child link
 
     # FIXME: remove instructor solution below
-    m = np.identity(4)
-    m[0:3, 0:3] = R.from_euler("XYZ", np.array(joint.rpy)).as_matrix()
-    m[0:3, 3] = joint.xyz
-
-    # apply joint configuration
     ApplyJointLimits(joint)
-    q = np.identity(4)
-    if joint.type == Joint.JointType.PRISMATIC:
-        m[0:3, 3] += joint.axis * joint.theta
-    else:
-        quat = [*(np.sin(joint.theta / 2) * joint.axis), np.cos(joint.theta / 2)]
-        q[0:3, 0:3] = R.from_quat(quat).as_matrix()
-    m = m @ q
-
-    mstack = mstack @ m
-    joint.transform = mstack
-    TraverseLinkFK(mstack, joint.child)
+
+    # rebuild the local transform if the joint configuration changed
+    if joint.theta != joint.fk_theta:
+        m = np.copy(joint.origin)
+
+        # apply joint configuration
+        if joint.type == Joint.JointType.PRISMATIC:
+            m[0:3, 3] += joint.axis * joint.theta
+        else:
+            m[0:3, 0:3] = m[0:3, 0:3] @ AxisAngleMatrix(joint.axis, joint.theta)
+        joint.local_transform = m
+        joint.fk_theta = joint.theta
+        dirty = True
+
+    # only recompute the subtree if something above it moved
+    if dirty:
+        joint.transform = mstack @ joint.local_transform
+    TraverseLinkFK(joint.transform, joint.child, dirty)
 
 
 def ApplyJointLimits(joint: Joint):
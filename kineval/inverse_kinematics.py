@@ -0,0 +1,255 @@
+from kineval import Robot, Joint, Vec, Vec3, Mat3, Mat4, TraverseRobotFK
+from kineval.forward_kinematics import ApplyJointLimits
+from enum import Enum
+import numpy as np
+
+# TODO: you may want to import other modules, such as numpy or scipy.spatial.transform
+
+
+class IKInfo:
+    """A struct for storing the inverse kinematics target, solver settings and state."""
+
+    class IKMethod(Enum):
+        JACOBIAN_TRANSPOSE = 0
+        PSEUDOINVERSE = 1
+        DAMPED_LEAST_SQUARES = 2
+
+    class IKState(Enum):
+        ITERATING = 0
+        REACHED = 1
+
+    def __init__(
+        self,
+        robot: Robot,
+        target_position: Vec3,
+        target_orientation: Mat3 | None = None,
+        method: IKMethod = IKMethod.DAMPED_LEAST_SQUARES,
+        step_length: float = 1.0,
+        max_step: float = 0.2,
+        damping: float = 0.1,
+        tolerance: float = 1e-3,
+        iterations_per_tick: int = 10,
+        endeffector_offset: Vec3 = None,
+    ):
+        """Initializes the IK problem for driving `robot.endeffector` to a target.
+
+        Args:
+            robot (Robot): Robot to solve IK for.
+            target_position (Vec3): World position to move the endeffector to.
+            target_orientation (Mat3 | None, optional): World rotation matrix to align
+                the endeffector with, or None to only solve for position. Defaults to
+                None.
+            method (IKMethod, optional): Solver to use. Defaults to
+                DAMPED_LEAST_SQUARES.
+            step_length (float, optional): Scale of each joint update. Defaults to 1.0.
+            max_step (float, optional): Maximum change of any joint in one iteration.
+                Defaults to 0.2.
+            damping (float, optional): Damping factor of damped least squares. Defaults
+                to 0.1.
+            tolerance (float, optional): Error norm at which the target is reached.
+                Defaults to 1e-3.
+            iterations_per_tick (int, optional): Maximum iterations per `StepIK`.
+                Defaults to 10.
+            endeffector_offset (Vec3, optional): Point on the endeffector (in its link
+                frame) to move to the target. Defaults to None (link origin).
+        """
+        self.robot: Robot = robot
+        self.chain: list[Joint] = EndeffectorChain(robot)  # non-fixed joints to solve
+        self.target_position: Vec3 = np.array(target_position, float)
+        self.target_orientation: Mat3 | None = (
+            None if target_orientation is None else np.array(target_orientation, float)
+        )
+        self.method: IKInfo.IKMethod = method
+        self.step_length: float = step_length
+        self.max_step: float = max_step
+        self.damping: float = damping
+        self.tolerance: float = tolerance
+        self.iterations_per_tick: int = iterations_per_tick
+        self.endeffector_offset: Vec3 = (
+            np.zeros((3), float)
+            if endeffector_offset is None
+            else np.array(endeffector_offset, float)
+        )
+        self.error: float = float("inf")  # norm of the last computed error
+        self.steps: int = 0
+        self.status: IKInfo.IKState = IKInfo.IKState.ITERATING
+
+    def setTarget(self, position: Vec3, orientation: Mat3 | None = None):
+        """Moves the target and restarts the solver.
+
+        Args:
+            position (Vec3): World position to move the endeffector to.
+            orientation (Mat3 | None, optional): World rotation matrix to align the
+                endeffector with, or None to only solve for position. Defaults to None.
+        """
+        self.target_position = np.array(position, float)
+        self.target_orientation = (
+            None if orientation is None else np.array(orientation, float)
+        )
+        self.status = IKInfo.IKState.ITERATING
+
+
+def EndeffectorChain(robot: Robot) -> list[Joint]:
+    """Returns the non-fixed joints between the robot base and `robot.endeffector`,
+    ordered from the base outwards.
+
+    Args:
+        robot (Robot): Robot to find the chain of.
+
+    Returns:
+        list[Joint]: The joints that move the endeffector.
+    """
+    # NOTE: This function is already written for you
+    chain = []
+    joint = robot.endeffector.parent
+    while joint is not None:
+        if joint.type != Joint.JointType.FIXED:
+            chain.insert(0, joint)
+        joint = joint.parent.parent
+    return chain
+
+
+def EndeffectorTransform(info: IKInfo) -> Mat4:
+    """Returns the world transform of the endeffector point, using the current joint
+    transforms of the robot.
+
+    Args:
+        info (IKInfo): Variables and info related to IK.
+
+    Returns:
+        Mat4: The homogeneous transform of the endeffector point.
+    """
+    # NOTE: This function is already written for you
+    link = info.robot.endeffector
+    transform = np.copy(
+        info.robot.transform if link.parent is None else link.parent.transform
+    )
+    transform[0:3, 3] += transform[0:3, 0:3] @ info.endeffector_offset
+    return transform
+
+
+def StepIK(info: IKInfo):
+    """Runs up to `info.iterations_per_tick` iterations of the IK solver, so the solver
+    can run every tick without stalling the update loop.
+
+    Args:
+        info (IKInfo): Variables and info related to IK.
+    """
+    # NOTE: Do NOT remove the following lines of code
+    if info is None or info.status != IKInfo.IKState.ITERATING:
+        return
+
+    # TODO: YOUR CODE HERE
+    # Implement iterations of Jacobian IK using `ComputeJacobian` and `ComputeIKError`.
+    # You should set info.status to REACHED once the error is within tolerance.
+    # Make sure to respect the joint limits.
+
+    # FIXME: remove instructor solution below
+    for _ in range(info.iterations_per_tick):
+        TraverseRobotFK(info.robot)
+        error = ComputeIKError(info)
+        info.error = np.linalg.norm(error)
+        if info.error <= info.tolerance:
+            info.status = IKInfo.IKState.REACHED
+            return
+
+        # step joints towards the target
+        jacobian = ComputeJacobian(info)
+        dtheta = info.step_length * SolveIKStep(info, jacobian, error)
+        largest = np.max(np.abs(dtheta), initial=0.0)
+        if largest > info.max_step:
+            dtheta *= info.max_step / largest
+        for joint, delta in zip(info.chain, dtheta):
+            joint.theta += delta
+            ApplyJointLimits(joint)
+        info.steps += 1
+
+
+def ComputeIKError(info: IKInfo) -> Vec:
+    """Computes the error between the endeffector and the target. The first three
+    entries are the position error. If the target has an orientation, the last three
+    entries are the orientation error as a rotation vector.
+
+    Args:
+        info (IKInfo): Variables and info related to IK.
+
+    Returns:
+        Vec: The (3,) or (6,) error vector.
+    """
+    # TODO: YOUR CODE HERE
+
+    # FIXME: remove instructor solution below
+    transform = EndeffectorTransform(info)
+    position_error = info.target_position - transform[0:3, 3]
+    if info.target_orientation is None:
+        return position_error
+
+    # sum of axis misalignments approximates the rotation vector for small errors
+    current = transform[0:3, 0:3]
+    target = info.target_orientation
+    orientation_error = 0.5 * np.sum(np.cross(current.T, target.T), axis=0)
+    return np.concatenate([position_error, orientation_error])
+
+
+def ComputeJacobian(info: IKInfo) -> np.ndarray:
+    """Computes the geometric Jacobian of the endeffector with respect to the joints in
+    `info.chain`, using the current joint transforms.
+
+    Args:
+        info (IKInfo): Variables and info related to IK.
+
+    Returns:
+        np.ndarray: The (3, n) or (6, n) Jacobian, where n is the length of the chain.
+    """
+    # TODO: YOUR CODE HERE
+    # For revolute joints, the linear velocity is axis x (endeffector - joint) and the
+    # angular velocity is the axis. Prismatic joints only have linear velocity.
+
+    # FIXME: remove instructor solution below
+    endeffector = EndeffectorTransform(info)[0:3, 3]
+    rows = 3 if info.target_orientation is None else 6
+    jacobian = np.zeros((rows, len(info.chain)), float)
+    for i, joint in enumerate(info.chain):
+        if joint.type == Joint.JointType.PRISMATIC:
+            # prismatic joints slide along their axis in the parent link frame
+            parent = joint.parent.parent
+            frame = info.robot.transform if parent is None else parent.transform
+            jacobian[0:3, i] = frame[0:3, 0:3] @ joint.axis
+        else:
+            axis = joint.transform[0:3, 0:3] @ joint.axis
+            axis /= np.linalg.norm(axis)
+            jacobian[0:3, i] = np.cross(axis, endeffector - joint.transform[0:3, 3])
+            if rows == 6:
+                jacobian[3:6, i] = axis
+    return jacobian
+
+
+def SolveIKStep(info: IKInfo, jacobian: np.ndarray, error: Vec) -> Vec:
+    """Computes the joint update that reduces the error, using `info.method`.
+
+    Args:
+        info (IKInfo): Variables and info related to IK.
+        jacobian (np.ndarray): The (m, n) Jacobian.
+        error (Vec): The (m,) error vector.
+
+    Returns:
+        Vec: The (n,) change in joint configurations.
+    """
+    # TODO: YOUR CODE HERE
+
+    # FIXME: remove instructor solution below
+    if info.method == IKInfo.IKMethod.JACOBIAN_TRANSPOSE:
+        # pick the step that minimizes the error along the transpose direction
+        dtheta = jacobian.T @ error
+        velocity = jacobian @ dtheta
+        denominator = np.dot(velocity, velocity)
+        if denominator == 0:
+            return np.zeros(len(info.chain), float)
+        return np.dot(error, velocity) / denominator * dtheta
+    if info.method == IKInfo.IKMethod.PSEUDOINVERSE:
+        return np.linalg.pinv(jacobian) @ error
+
+    # damped least squares: J^T (J J^T + lambda^2 I)^-1 e
+    rows = jacobian.shape[0]
+    jjt = jacobian @ jacobian.T + info.damping**2 * np.identity(rows)
+    return jacobian.T @ np.linalg.solve(jjt, error)
@@ -7,8 +7,12 @@ from kineval import (
     TraversePathPlan,
     InitRobot,
     TraverseRobotFK,
+    CollisionResult,
     IsCollision,
-    StepRRT,
+    StepRRTBudget,
+    RRTStarInfo,
+    StepRRTStar,
+    StepIK,
     KinevalWindow,
     KinevalWindowSettings,
 )
@@ -26,6 +30,7 @@ class KinevalSettings:
         movement_speed: float = 5.0,
         turn_speed: float = 3.0,
         control_speed: float = 1.0,
+        planner_budget: float = 0.008,
     ) -> None:
         self.window_settings: KinevalWindowSettings = (
             KinevalWindowSettings() if window_settings is None else window_settings
@@ -34,6 +39,7 @@ class KinevalSettings:
         self.movement_speed: float = movement_speed  # robot movement speed in m/s
         self.turn_speed: float = turn_speed  # robot turn speed in rad/s
         self.control_speed: float = control_speed  # robot control speed in rad or m/s
+        self.planner_budget: float = planner_budget  # planning time per tick in s
 
 
 class Kineval:
@@ -116,9 +122,16 @@ class Kineval:
             )
 
         # run student functions
-        StepRRT(self.window.rrt)
+        if self.window.rrt_process is None:
+            StepRRTBudget(
+                self.window.rrt,
+                self.settings.planner_budget,
+                StepRRTStar if isinstance(self.window.rrt, RRTStarInfo) else None,
+            )
+        StepIK(self.window.ik)
         TraverseRobotFK(self.robot)
-        IsCollision(self.robot, self.world)
+        collision = CollisionResult()
+        IsCollision(self.robot, self.world, collision)
 
         # update window
-        self.window.update()
+        self.window.update(collision)
@@ -0,0 +1,155 @@
+from kineval import Robot, Vec, VecN, IntVec, BoolVec
+from scipy.spatial import cKDTree
+from math import isqrt
+import numpy as np
+
+
+def WrappedDimensions(robot: Robot) -> BoolVec:
+    """Returns which entries of a configuration vector are angles without limits, and
+    so wrap around every 2 pi. These are the base rotation and continuous joints.
+
+    Args:
+        robot (Robot): Robot of the configurations.
+
+    Returns:
+        BoolVec: (dof,) mask of wrapping configuration entries.
+    """
+    return np.array(
+        [False, False, True, *(joint.limits is None for joint in robot.joints)], bool
+    )
+
+
+def ConfigDifference(start: Vec | VecN, end: Vec | VecN, wrapped: BoolVec) -> Vec:
+    """Returns `end - start`, taking the short way around for wrapping entries, so
+    `start + ConfigDifference(start, end, wrapped)` is equivalent to `end`.
+
+    Args:
+        start (Vec | VecN): Configuration vector or (N, dof) array of vectors.
+        end (Vec | VecN): Configuration vector or (N, dof) array of vectors.
+        wrapped (BoolVec): (dof,) mask of wrapping entries, from `WrappedDimensions`.
+
+    Returns:
+        Vec: The difference, with wrapping entries within [-pi, pi).
+    """
+    difference = np.asarray(end, float) - np.asarray(start, float)
+    return np.where(wrapped, np.mod(difference + np.pi, 2 * np.pi) - np.pi, difference)
+
+
+class NearestNeighborIndex:
+    """An incremental nearest neighbor index over configuration vectors. Vectors are
+    stored in a KD-tree with periodic wrapping entries. New vectors are kept in a
+    linear tail until the tail is large enough to rebuild the tree."""
+
+    def __init__(self, wrapped: BoolVec, min_tail: int = 64, capacity: int = 256):
+        """Creates an empty index.
+
+        Args:
+            wrapped (BoolVec): (dof,) mask of wrapping entries, from
+                `WrappedDimensions`.
+            min_tail (int, optional): Smallest tail that triggers a rebuild. Larger
+                trees rebuild when the tail reaches twice the square root of their
+                size, which balances the rebuild and scan costs. Defaults to 64.
+            capacity (int, optional): Initial number of stored vectors before the
+                storage grows. Defaults to 256.
+        """
+        self.wrapped: BoolVec = np.array(wrapped, bool)  # wrapping entries
+        self.min_tail: int = min_tail  # smallest tail that triggers a rebuild
+        self.points: VecN = np.empty(
+            (capacity, len(self.wrapped)), float
+        )  # stored vectors, with wrapping entries within [0, 2 pi)
+        self.size: int = 0  # number of stored vectors
+        self.tree: cKDTree | None = None  # KD-tree over the first `indexed` vectors
+        self.indexed: int = 0  # number of vectors in the KD-tree
+
+    def __len__(self) -> int:
+        return self.size
+
+    def add(self, vector: Vec) -> int:
+        """Adds a configuration vector to the index.
+
+        Args:
+            vector (Vec): Configuration vector to add.
+
+        Returns:
+            int: Index of the added vector, in insertion order.
+        """
+        if self.size == len(self.points):
+            self.points = np.concatenate([self.points, np.empty_like(self.points)])
+        self.points[self.size] = self.__wrap(vector)
+        self.size += 1
+
+        # rebuild the tree once the linear tail gets too long
+        if self.size - self.indexed >= max(self.min_tail, 2 * isqrt(self.indexed)):
+            self.tree = cKDTree(
+                self.points[: self.size], boxsize=np.where(self.wrapped, 2 * np.pi, 0)
+            )
+            self.indexed = self.size
+        return self.size - 1
+
+    def nearest(self, vector: Vec) -> tuple[int, float]:
+        """Finds the stored configuration vector closest to `vector`.
+
+        Args:
+            vector (Vec): Configuration vector to search from.
+
+        Returns:
+            tuple[int, float]: Index of the closest vector and its distance, or -1 and
+                inf if the index is empty.
+        """
+        point = self.__wrap(vector)
+        index, distance = -1, float("inf")
+        if self.tree is not None:
+            distance, index = self.tree.query(point)
+
+        # search the tail linearly
+        if self.indexed < self.size:
+            difference = ConfigDifference(
+                self.points[self.indexed : self.size], point, self.wrapped
+            )
+            distances = np.einsum("ij,ij->i", difference, difference)
+            closest = np.argmin(distances)
+            if distances[closest] < distance * distance:
+                index, distance = self.indexed + closest, np.sqrt(distances[closest])
+        return int(index), float(distance)
+
+    def within(self, vector: Vec, radius: float) -> IntVec:
+        """Finds the stored configuration vectors within `radius` of `vector`.
+
+        Args:
+            vector (Vec): Configuration vector to search from.
+            radius (float): Largest distance of returned vectors.
+
+        Returns:
+            IntVec: Indices of the vectors, in no particular order.
+        """
+        point = self.__wrap(vector)
+        indices = (
+            np.array(self.tree.query_ball_point(point, radius), int)
+            if self.tree is not None
+            else np.zeros((0), int)
+        )
+
+        # search the tail linearly
+        if self.indexed < self.size:
+            difference = ConfigDifference(
+                self.points[self.indexed : self.size], point, self.wrapped
+            )
+            distances = np.einsum("ij,ij->i", difference, difference)
+            tail = self.indexed + np.flatnonzero(distances <= radius * radius)
+            indices = np.concatenate([indices, tail])
+        return indices
+
+    def __wrap(self, vector: Vec) -> Vec:
+        """Maps wrapping entries of a vector into [0, 2 pi).
+
+        Args:
+            vector (Vec): Configuration vector.
+
+        Returns:
+            Vec: The wrapped vector.
+        """
+        vector = np.asarray(vector, float)
+        wrapped = np.mod(vector, 2 * np.pi)
+        # tiny negative angles can round up to exactly 2 pi
+        wrapped[wrapped >= 2 * np.pi] = 0.0
+        return np.where(self.wrapped, wrapped, vector)
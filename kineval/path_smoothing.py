@@ -0,0 +1,221 @@
+from kineval import Robot, World, Joint, VecN, BoolVec, IsPoseCollisionBatch
+from kineval.collision import MaxDisplacement
+from kineval.nearest_neighbors import ConfigDifference
+from scipy.interpolate import CubicSpline
+import numpy as np
+
+
+def SmoothPath(
+    robot: Robot,
+    world: World,
+    path: VecN,
+    wrapped: BoolVec,
+    iterations: int = 100,
+    spline: bool = False,
+    spacing: float = 0.25,
+    resolution: float = 0.1,
+    rng: np.random.Generator = None,
+) -> VecN:
+    """Shortens a collision free path with randomized shortcuts, then optionally
+    smooths it with a cubic spline. Every change is checked for collision, so the
+    result is collision free whenever the input is.
+
+    Args:
+        robot (Robot): Robot following the path.
+        world (World): World the robot is in.
+        path (VecN): (N, dof) configuration vectors from start to goal.
+        wrapped (BoolVec): (dof,) mask of wrapping entries, from `WrappedDimensions`.
+        iterations (int, optional): Number of shortcut attempts. Defaults to 100.
+        spline (bool, optional): Whether to fit a spline through the shortcut path.
+            Defaults to False.
+        spacing (float, optional): Configuration space distance between points of the
+            spline path. Defaults to 0.25.
+        resolution (float, optional): Largest distance any point on the robot may move
+            between checked configurations. Defaults to 0.1.
+        rng (np.random.Generator, optional): Random generator. Defaults to None.
+
+    Returns:
+        VecN: (M, dof) smoothed path with the same start and goal.
+    """
+    rng = np.random.default_rng() if rng is None else rng
+    path = ShortcutPath(robot, world, path, wrapped, iterations, resolution, rng)
+    if spline:
+        path = SplinePath(robot, world, path, wrapped, spacing, resolution)
+    return path
+
+
+def ShortcutPath(
+    robot: Robot,
+    world: World,
+    path: VecN,
+    wrapped: BoolVec,
+    iterations: int = 100,
+    resolution: float = 0.1,
+    rng: np.random.Generator = None,
+) -> VecN:
+    """Tries to shortcut random pairs of path points. Half of the attempts replace the
+    points between them with a straight line. The other half only straighten one group
+    of entries (the base, or a single joint) and keep the rest of the motion, which
+    still shortens paths where no full shortcut is free.
+
+    Args:
+        robot (Robot): Robot following the path.
+        world (World): World the robot is in.
+        path (VecN): (N, dof) configuration vectors from start to goal.
+        wrapped (BoolVec): (dof,) mask of wrapping entries, from `WrappedDimensions`.
+        iterations (int, optional): Number of shortcut attempts. Defaults to 100.
+        resolution (float, optional): Largest distance any point on the robot may move
+            between checked configurations. Defaults to 0.1.
+        rng (np.random.Generator, optional): Random generator. Defaults to None.
+
+    Returns:
+        VecN: (M, dof) shortened path with the same start and goal.
+    """
+    rng = np.random.default_rng() if rng is None else rng
+    path = np.array(path, float)
+    groups = [np.arange(3)] + [
+        np.array([3 + i])
+        for i, joint in enumerate(robot.joints)
+        if joint.type != Joint.JointType.FIXED
+    ]  # entries straightened together by partial shortcuts
+
+    for _ in range(iterations):
+        if len(path) <= 2:
+            break
+        i, j = np.sort(rng.choice(len(path), 2, replace=False))
+        if j - i < 2:
+            continue
+        segment = UnwrapPath(path[i : j + 1], wrapped)
+
+        if rng.random() < 0.5:
+            # replace the segment with a straight line, checked the short way around as
+            # it will be traversed
+            end = segment[0] + ConfigDifference(segment[0], segment[-1], wrapped)
+            if not IsPathCollision(
+                robot, world, np.stack([segment[0], end]), resolution
+            ):
+                path = np.concatenate([path[: i + 1], path[j:]])
+            continue
+
+        # straighten one group of entries along the segment
+        group = groups[rng.integers(len(groups))]
+        t = np.linspace(0.0, 1.0, len(segment))[:, np.newaxis]
+        straightened = np.copy(segment)
+        straightened[:, group] = segment[0, group] + t * (
+            segment[-1, group] - segment[0, group]
+        )
+        if PathLength(straightened, wrapped) < PathLength(
+            segment, wrapped
+        ) - 1e-9 and not IsPathCollision(robot, world, straightened, resolution):
+            path[i : j + 1] = straightened
+    return path
+
+
+def SplinePath(
+    robot: Robot,
+    world: World,
+    path: VecN,
+    wrapped: BoolVec,
+    spacing: float = 0.25,
+    resolution: float = 0.1,
+) -> VecN:
+    """Fits a cubic spline through the path points, parameterized by distance along
+    the path, and samples it evenly. The spline can swing wide of the path near sharp
+    corners, so the path is returned unchanged if the spline is in collision.
+
+    Args:
+        robot (Robot): Robot following the path.
+        world (World): World the robot is in.
+        path (VecN): (N, dof) configuration vectors from start to goal.
+        wrapped (BoolVec): (dof,) mask of wrapping entries, from `WrappedDimensions`.
+        spacing (float, optional): Configuration space distance between samples.
+            Defaults to 0.25.
+        resolution (float, optional): Largest distance any point on the robot may move
+            between checked configurations. Defaults to 0.1.
+
+    Returns:
+        VecN: (M, dof) spline samples, or the path if the spline is in collision.
+    """
+    path = UnwrapPath(path, wrapped)
+    lengths = np.concatenate(
+        [[0.0], np.cumsum(np.linalg.norm(np.diff(path, axis=0), axis=1))]
+    )  # distance along the path to each point
+    keep = np.concatenate([[True], np.diff(lengths) > 1e-9])
+    if np.count_nonzero(keep) < 3:
+        return path
+
+    spline = CubicSpline(lengths[keep], path[keep], axis=0)
+    samples = np.linspace(0.0, lengths[-1], max(3, int(lengths[-1] / spacing) + 2))
+    smoothed = spline(samples)
+
+    # the spline must respect the joint limits
+    for i, joint in enumerate(robot.joints):
+        if joint.limits is not None:
+            smoothed[:, 3 + i] = np.clip(smoothed[:, 3 + i], *joint.limits)
+    smoothed[[0, -1]] = path[[0, -1]]
+
+    if IsPathCollision(robot, world, smoothed, resolution):
+        return path
+    return smoothed
+
+
+def IsPathCollision(
+    robot: Robot, world: World, path: VecN, resolution: float = 0.1
+) -> bool:
+    """Returns whether the robot collides anywhere along a path of straight edges. The
+    first point is assumed to be collision free. Every edge is sampled so that no point
+    on the robot moves more than `resolution` between samples, and all samples are
+    checked in one batch.
+
+    Args:
+        robot (Robot): Robot following the path.
+        world (World): World the robot is in.
+        path (VecN): (N, dof) configuration vectors, without wrapping jumps.
+        resolution (float, optional): Largest distance any point on the robot may move
+            between checked configurations. Defaults to 0.1.
+
+    Returns:
+        bool: Whether the path is in collision.
+    """
+    samples = []
+    for start, end in zip(path[:-1], path[1:]):
+        n = max(1, int(np.ceil(MaxDisplacement(robot, end - start) / resolution)))
+        t = np.arange(1, n + 1)[:, np.newaxis] / n
+        samples.append(start + t * (end - start))
+    if not samples:
+        return False
+    return bool(IsPoseCollisionBatch(robot, np.concatenate(samples), world).any())
+
+
+def UnwrapPath(path: VecN, wrapped: BoolVec) -> VecN:
+    """Removes wrapping jumps from a path, so the straight line between consecutive
+    points is the short way around.
+
+    Args:
+        path (VecN): (N, dof) configuration vectors.
+        wrapped (BoolVec): (dof,) mask of wrapping entries, from `WrappedDimensions`.
+
+    Returns:
+        VecN: (N, dof) equivalent configuration vectors, starting at `path[0]`.
+    """
+    path = np.asarray(path, float)
+    steps = ConfigDifference(path[:-1], path[1:], wrapped)
+    return path[0] + np.concatenate([np.zeros((1, path.shape[1])), np.cumsum(steps, 0)])
+
+
+def PathLength(path: VecN, wrapped: BoolVec) -> float:
+    """Returns the configuration space length of a path, the short way around for
+    wrapping entries.
+
+    Args:
+        path (VecN): (N, dof) configuration vectors.
+        wrapped (BoolVec): (dof,) mask of wrapping entries, from `WrappedDimensions`.
+
+    Returns:
+        float: Sum of the edge lengths.
+    """
+    path = np.asarray(path, float)
+    if len(path) < 2:
+        return 0.0
+    steps = ConfigDifference(path[:-1], path[1:], wrapped)
+    return float(np.sum(np.linalg.norm(steps, axis=1)))
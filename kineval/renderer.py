@@ -9,12 +9,21 @@ from kineval import (
     TraverseJointDown,
     TraverseJointAdjacent,
     RobotConfiguration,
+    CollisionResult,
     RRTInfo,
+    RRTObserver,
+    RRTProcess,
+    RRTStarInfo,
+    IKInfo,
     CollapsibleWidget,
     SliderWidget,
     VariableDisplayWidget,
     Vec3,
+    VecN,
+    IntVec,
 )
+from kineval.rrt import RRTTree
+from kineval.path_smoothing import PathLength
 from pyvistaqt import QtInteractor
 from PyQt5.QtGui import QKeyEvent
 from PyQt5.QtCore import Qt
@@ -29,8 +38,11 @@ from PyQt5.QtWidgets import (
     QSpacerItem,
     QSizePolicy,
     QPushButton,
+    QComboBox,
 )
 import numpy as np
+import pyvista as pv
+import os
 
 
 class KinevalWindowSettings:
@@ -79,6 +91,49 @@ class KinevalWindowSettings:
         self.terrain_opacity: float = terrain_opacity  # opacity of terrain
 
 
+class RRTMarkers(RRTObserver):
+    """Draws RRT vertices, tree edges and the found path as world markers."""
+
+    def __init__(self, world: World):
+        self.world: World = world  # world to add markers to
+
+    def onVertices(self, tree: RRTTree, nodes: IntVec):
+        points = MarkerPositions(tree.configurations[nodes])
+        self.world.markers.addPoints(points, [1.0, 1.0, 0.0])
+
+        # connect the new vertices to their parents
+        parents = tree.parents[nodes]
+        linked = parents >= 0
+        self.world.markers.addSegments(
+            MarkerPositions(tree.configurations[parents[linked]]),
+            points[linked],
+            [1.0, 1.0, 0.0],
+        )
+
+    def onClear(self):
+        self.world.markers.clear()
+
+    def onPath(self, path: VecN):
+        points = MarkerPositions(path)
+        self.world.markers.addPoints(points, [1.0, 0.0, 0.0])
+        self.world.markers.addSegments(points[:-1], points[1:], [1.0, 0.0, 0.0])
+
+
+def MarkerPositions(configurations: VecN) -> VecN:
+    """Returns where to draw markers of configurations, above the base position.
+
+    Args:
+        configurations (VecN): (N, dof) array of configuration vectors.
+
+    Returns:
+        VecN: (N, 3) marker positions.
+    """
+    configurations = np.atleast_2d(configurations)
+    return np.column_stack(
+        [configurations[:, 0:2], np.ones(len(configurations), float)]
+    )
+
+
 class KinevalWindow(QMainWindow):
     """Class for handling the window and rendering."""
 
@@ -102,8 +157,21 @@ class KinevalWindow(QMainWindow):
         self.default_config: RobotConfiguration = RobotConfiguration(
             robot
         )  # default configuration of robot
-        self.rrt: RRTInfo = None  # RRTInfo
+        self.rrt: RRTInfo | RRTStarInfo = None  # RRTInfo or RRTStarInfo
         self.rrt_stepsize: float = 0.5  # RRT step size
+        self.rrt_anytime: bool = False  # whether to plan with RRT* instead
+        self.rrt_time_budget: float = 10.0  # RRT* planning time in seconds
+        self.rrt_lazy: bool = False  # whether to defer edge checks to found paths
+        self.rrt_spline: bool = False  # whether to fit a spline through found paths
+        self.rrt_background: bool = False  # whether to plan in a separate process
+        self.rrt_planners: int = 1  # number of planners racing in the background
+        self.rrt_process: RRTProcess | None = None  # process planning `rrt`, if any
+        self.ik: IKInfo = None  # IKInfo
+        self.ik_target: Vec3 = np.array([0.5, 1.0, 1.0], float)  # IK target position
+        self.ik_method: IKInfo.IKMethod = (
+            IKInfo.IKMethod.DAMPED_LEAST_SQUARES
+        )  # IK solver
+        self.ik_target_geom: pv.Actor = None  # rendered geometry of IK target
         self.detect_keys = {  # set of keys to detect
             Qt.Key_W,  # front
             Qt.Key_S,  # back
@@ -158,6 +226,12 @@ class KinevalWindow(QMainWindow):
         self.__addRobotToPlotter()
         self.__addWorldToPlotter()
 
+        # add ik target
+        self.ik_target_geom = Sphere([0.0, 0.0, 0.0], 0.1)
+        self.ik_target_geom.prop.SetColor(*self.settings.selection_color)
+        self.ik_target_geom.SetPosition(*self.ik_target)
+        self.plotter.add_actor(self.ik_target_geom)
+
     def __addRobotToPlotter(self):
         """Creates and adds the robot link and joint geometries to the plotter
         widget."""
@@ -227,6 +301,10 @@ class KinevalWindow(QMainWindow):
         for obstacle in self.world.obstacles:
             self.plotter.add_actor(obstacle.geom)
 
+        # add markers
+        self.plotter.add_actor(self.world.markers.point_geom)
+        self.plotter.add_actor(self.world.markers.line_geom)
+
     def createGUIWidget(self):
         """Initializes a dock widget for displaying an interactive GUI for controlling
         the program."""
@@ -265,6 +343,9 @@ class KinevalWindow(QMainWindow):
         # display settings (link, joints, world)
         self.__addDisplayGUI()
 
+        # ik settings
+        self.__addIKGUI()
+
         # rrt settings
         self.__addRRTGUI()
 
@@ -341,6 +422,35 @@ class KinevalWindow(QMainWindow):
             )
             joint_settings.addWidget(select_color_slider)
 
+    def __addIKGUI(self):
+        """Creates and adds inverse kinematics settings to the GUI."""
+        ik_settings = CollapsibleWidget("Inverse Kinematics")
+        self.gui_layout.addWidget(ik_settings)
+
+        # add button for starting solver
+        start_button = QPushButton("Run Inverse Kinematics")
+        start_button.clicked.connect(self.onRunIK)
+        ik_settings.addWidget(start_button)
+
+        # add solver selection
+        method_select = QComboBox()
+        method_select.addItems([method.name for method in IKInfo.IKMethod])
+        method_select.setCurrentIndex(self.ik_method.value)
+        method_select.currentIndexChanged.connect(self.onUpdateIKMethod)
+        ik_settings.addWidget(method_select)
+
+        # add target position sliders
+        for i, axis in enumerate(("x", "y", "z")):
+            target_slider = SliderWidget(f"Target {axis}", self.ik_target[i], -5.0, 5.0)
+            target_slider.setCallback(lambda val, i=i: self.onUpdateIKTarget(val, i))
+            ik_settings.addWidget(target_slider)
+
+        # show solver info
+        self.ik_status_widget = VariableDisplayWidget("Solver Status", "Waiting")
+        ik_settings.addWidget(self.ik_status_widget)
+        self.ik_error_widget = VariableDisplayWidget("Error", "-")
+        ik_settings.addWidget(self.ik_error_widget)
+
     def __addRRTGUI(self):
         """Creates and adds motion planning settings to the GUI."""
         rrt_settings = CollapsibleWidget("Motion Planning")
@@ -351,6 +461,42 @@ class KinevalWindow(QMainWindow):
         start_button.clicked.connect(self.onRunRRT)
         rrt_settings.addWidget(start_button)
 
+        # add toggle and time budget for the anytime planner
+        anytime_toggle = QCheckBox("Anytime RRT*", checked=False)
+        anytime_toggle.toggled.connect(lambda: self.onUpdateRRTAnytime(anytime_toggle))
+        rrt_settings.addWidget(anytime_toggle)
+        time_budget_slider = SliderWidget(
+            "Time Budget", self.rrt_time_budget, 1.0, 60.0
+        )
+        time_budget_slider.setCallback(self.onUpdateRRTTimeBudget)
+        rrt_settings.addWidget(time_budget_slider)
+
+        # add toggle for lazy collision checking
+        lazy_toggle = QCheckBox("Lazy Collision Checking", checked=False)
+        lazy_toggle.toggled.connect(lambda: self.onUpdateRRTLazy(lazy_toggle))
+        rrt_settings.addWidget(lazy_toggle)
+
+        # add toggle for spline smoothing of the found path
+        spline_toggle = QCheckBox("Spline Smoothing", checked=False)
+        spline_toggle.toggled.connect(lambda: self.onUpdateRRTSpline(spline_toggle))
+        rrt_settings.addWidget(spline_toggle)
+
+        # add toggle for planning in a separate process
+        background_toggle = QCheckBox("Plan in Background", checked=False)
+        background_toggle.toggled.connect(
+            lambda: self.onUpdateRRTBackground(background_toggle)
+        )
+        rrt_settings.addWidget(background_toggle)
+
+        # add selection of the number of background planners
+        planners_select = QComboBox()
+        planners_select.addItems(
+            [f"{n} Planner{'s' if n > 1 else ''}" for n in range(1, os.cpu_count() + 1)]
+        )
+        planners_select.setCurrentIndex(self.rrt_planners - 1)
+        planners_select.currentIndexChanged.connect(self.onUpdateRRTPlanners)
+        rrt_settings.addWidget(planners_select)
+
         # add step size slider
         step_size_slider = SliderWidget("Step Size", self.rrt_stepsize, 0.1, 1.0)
         step_size_slider.setCallback(self.onUpdateRRTStepSize)
@@ -361,10 +507,21 @@ class KinevalWindow(QMainWindow):
         rrt_settings.addWidget(self.rrt_status_widget)
         self.rrt_steps_widget = VariableDisplayWidget("Iterations", "0")
         rrt_settings.addWidget(self.rrt_steps_widget)
+        self.rrt_rate_widget = VariableDisplayWidget("Iterations/s", "0")
+        rrt_settings.addWidget(self.rrt_rate_widget)
+        self.rrt_cost_widget = VariableDisplayWidget("Path Cost", "-")
+        rrt_settings.addWidget(self.rrt_cost_widget)
 
-    def update(self):
-        """Does all the visual updates of the window."""
+    def update(self, collision: CollisionResult | None = None):
+        """Does all the visual updates of the window.
+
+        Args:
+            collision (CollisionResult | None, optional): Collision of the robot's
+                current pose. Colliding links show their collision bounds. Defaults to
+                None (no collision).
+        """
         # update link visuals
+        colliding = [] if collision is None else collision.links
         for link in self.robot.links:
             # update link and link collision transformation
             link_transform = (
@@ -374,6 +531,7 @@ class KinevalWindow(QMainWindow):
             )
             link.geom.user_matrix = link_transform
             link.bbox_geom.user_matrix = link_transform
+            link.bbox_geom.SetVisibility(link.name in colliding)
 
         # update joint visuals
         for joint in self.robot.joints:
@@ -381,10 +539,28 @@ class KinevalWindow(QMainWindow):
             joint.geom.user_matrix = joint.transform
             joint.axis_geom.user_matrix = joint.transform
 
+        # update markers
+        self.world.markers.update()
+
+        # update ik widgets
+        if self.ik is not None:
+            self.ik_status_widget.setValue(self.ik.status.name)
+            self.ik_error_widget.setValue(f"{self.ik.error:.4f}")
+
         # update rrt widgets
+        if self.rrt_process is not None:
+            self.rrt_process.poll()
+            self.rrt.notifyObserver()
         if self.rrt is not None:
             self.rrt_status_widget.setValue(self.rrt.status.name)
             self.rrt_steps_widget.setValue(str(self.rrt.steps))
+            rate = self.rrt.steps / self.rrt.elapsed if self.rrt.elapsed > 0 else 0.0
+            self.rrt_rate_widget.setValue(f"{rate:.0f}")
+            self.rrt_cost_widget.setValue(
+                f"{PathLength(self.rrt.path, self.rrt.wrapped):.3f}"
+                if len(self.rrt.path) > 0
+                else "-"
+            )
 
         # update plotter widget
         self.plotter.update()
@@ -576,17 +752,115 @@ class KinevalWindow(QMainWindow):
                 )
             joint.geom.mapper = joint_geom.mapper
 
+    def onRunIK(self):
+        """Starts the IK solver towards the current target."""
+        self.ik = IKInfo(self.robot, self.ik_target, method=self.ik_method)
+
+    def onUpdateIKMethod(self, index: int):
+        """Sets the IK solver.
+
+        Args:
+            index (int): Value of the selected `IKInfo.IKMethod`.
+        """
+        self.ik_method = IKInfo.IKMethod(index)
+        if self.ik:
+            self.ik.method = self.ik_method
+            self.ik.status = IKInfo.IKState.ITERATING
+
+    def onUpdateIKTarget(self, value: float, index: int):
+        """Updates `self.ik_target` at index `index` and moves the IK target.
+
+        Args:
+            value (float): Value of slider to set to.
+            index (int): Axis index to modify. 0=x, 1=y, 2=z.
+        """
+        self.ik_target[index] = value
+        self.ik_target_geom.SetPosition(*self.ik_target)
+        if self.ik:
+            self.ik.setTarget(self.ik_target)
+
     def onRunRRT(self):
-        """Clears the markers and resets the RRTInfo."""
-        self.world.clearMarkers(self.plotter)
+        """Clears the markers and resets the RRTInfo. In background mode, the planners
+        run in separate processes and `rrt` mirrors the progress."""
+        if self.rrt_process is not None:
+            self.rrt_process.stop()
+            self.rrt_process = None
+        self.world.markers.clear()
+        if self.rrt_anytime:
+            # RRT* always runs in this process
+            self.rrt = RRTStarInfo(
+                self.robot,
+                self.world,
+                self.rrt_stepsize,
+                RobotConfiguration(self.robot),
+                self.default_config,
+                self.rrt_time_budget,
+                observer=RRTMarkers(self.world),
+            )
+            return
         self.rrt = RRTInfo(
             self.robot,
             self.world,
-            self.plotter,
             self.rrt_stepsize,
             RobotConfiguration(self.robot),
             self.default_config,
+            observer=RRTMarkers(self.world),
+            spline=self.rrt_spline,
+            lazy=self.rrt_lazy,
         )
+        if self.rrt_background:
+            self.rrt_process = RRTProcess(self.rrt, n_planners=self.rrt_planners)
+
+    def onUpdateRRTAnytime(self, button: QCheckBox):
+        """Sets whether the next planner is RRT* instead of RRT-connect.
+
+        Args:
+            button (QCheckBox): Button used for toggle.
+        """
+        self.rrt_anytime = button.isChecked()
+
+    def onUpdateRRTTimeBudget(self, value: float):
+        """Sets the planning time of RRT*.
+
+        Args:
+            value (float): Time budget in seconds.
+        """
+        self.rrt_time_budget = value
+        if isinstance(self.rrt, RRTStarInfo):
+            self.rrt.time_budget = value
+
+    def onUpdateRRTLazy(self, button: QCheckBox):
+        """Sets whether the next RRT-connect planner defers edge collision checks until
+        it has a candidate path.
+
+        Args:
+            button (QCheckBox): Button used for toggle.
+        """
+        self.rrt_lazy = button.isChecked()
+
+    def onUpdateRRTSpline(self, button: QCheckBox):
+        """Sets whether the next found path is smoothed with a spline.
+
+        Args:
+            button (QCheckBox): Button used for toggle.
+        """
+        self.rrt_spline = button.isChecked()
+
+    def onUpdateRRTBackground(self, button: QCheckBox):
+        """Sets whether the next planner runs in a separate process.
+
+        Args:
+            button (QCheckBox): Button used for toggle.
+        """
+        self.rrt_background = button.isChecked()
+
+    def onUpdateRRTPlanners(self, index: int):
+        """Sets how many planners race for the first path in background mode.
+
+        Args:
+            index (int): Index of the selected number of planners.
+        """
+        self.rrt_planners = index + 1
 
     def onUpdateRRTStepSize(self, value: float):
         """Sets RRT step size.
@@ -1,4 +1,4 @@
-from kineval import Vec2, Vec3, Mat4, Vec
+from kineval import Vec2, Vec3, Mat4, Vec, VecN, EulerTransform
 import numpy as np
 import pyvista as pv
 from enum import Enum
@@ -20,6 +20,22 @@ class Link:
         self.bbox: Vec = np.array(
             geom.GetBounds(), float
         )  # xyz bounds of the link geometry
+        self.radius: float = 0.5 * np.linalg.norm(
+            self.bbox[1::2] - self.bbox[::2]
+        )  # radius of the sphere around the bounds, centered at `center`
+        self.reach: float | None = (
+            None  # radius around the link origin that bounds the link and descendants
+        )
+        self.spheres: VecN | None = (
+            None  # (K, 4) centers and radii of spheres bounding the link geometry
+        )
+
+    def __getstate__(self) -> dict:
+        """Drops the rendered geometries, so the link can be pickled as pure data."""
+        state = self.__dict__.copy()
+        state["geom"] = None
+        state["bbox_geom"] = None
+        return state
 
 
 class Joint:
@@ -48,6 +64,7 @@ class Joint:
         self.child: Link = child  # child link
         self.type: Joint.JointType = type  # type of joint
         # static configurations
+        self._origin: Mat4 | None = None  # cached transform built from xyz and rpy
         self.xyz: Vec3 = (
             np.zeros((3), float) if xyz is None else np.array(xyz, float)
         )  # starting position
@@ -63,10 +80,64 @@ class Joint:
         # dynamic configurations
         self.theta: float = 0.0  # configuration of joint
         self.transform: Mat4 = np.identity(4, float)  # homogenous transform matrix
+        self.local_transform: Mat4 = np.identity(
+            4, float
+        )  # homogenous transform matrix relative to the parent link
+        self.fk_theta: float | None = None  # theta at last FK update (None if stale)
         # visual
         self.geom: pv.Actor = None  # rendered geometry of joint
         self.axis_geom: pv.Actor = None  # rendered geometry of joint axis
 
+    def __getstate__(self) -> dict:
+        """Drops the rendered geometries, so the joint can be pickled as pure data."""
+        state = self.__dict__.copy()
+        state["geom"] = None
+        state["axis_geom"] = None
+        return state
+
+    @property
+    def xyz(self) -> Vec3:
+        """Vec3: Position of the joint relative to its parent link. Reassigning it
+        invalidates the cached `origin` and the `reach` of the links above it."""
+        return self._xyz
+
+    @xyz.setter
+    def xyz(self, xyz: Vec3):
+        self._xyz = np.array(xyz, float)
+        self._origin = None
+        self.fk_theta = None
+        self.clearReach()
+
+    @property
+    def rpy(self) -> Vec3:
+        """Vec3: Rotation of the joint relative to its parent link. Reassigning it
+        invalidates the cached `origin` and the `reach` of the links above it."""
+        return self._rpy
+
+    @rpy.setter
+    def rpy(self, rpy: Vec3):
+        self._rpy = np.array(rpy, float)
+        self._origin = None
+        self.fk_theta = None
+        self.clearReach()
+
+    def clearReach(self):
+        """Clears the cached `reach` of the parent link and its ancestors, since the
+        joint offset bounds how far the child subtree extends from them."""
+        link = self.parent
+        while link is not None:
+            link.reach = None
+            link = None if link.parent is None else link.parent.parent
+
+    @property
+    def origin(self) -> Mat4:
+        """Mat4: Homogeneous transform of the joint relative to its parent link when
+        `theta` is 0. Built from `xyz` and `rpy` and cached until either is
+        reassigned."""
+        if self._origin is None:
+            self._origin = EulerTransform(self._xyz, self._rpy)
+        return self._origin
+
 
 class Robot:
     """A class for representing a robot."""
@@ -95,6 +166,20 @@ class Robot:
             np.zeros((3), float) if rpy is None else np.array(rpy, float)
         )  # base rotation
         self.transform: Mat4 = np.identity(4, float)  # homogenous transform matrix
+        self.fk_xyz: Vec3 | None = None  # base position at last FK update
+        self.fk_rpy: Vec3 | None = None  # base rotation at last FK update
         self.facing: Vec3 = np.array([1, 0, 0], float)  # unit vector of front direction
+        # batch kinematics
+        self.fk_engine = None  # compiled FKEngine, built by GetFKEngine on first use
+        self.link_shapes = (
+            None  # packed LinkShapes, built by GetLinkShapes on first use
+        )
+        # self collision
+        self.self_collision: bool = (
+            False  # whether links are checked against each other, opt-in per robot
+        )
+        self.allowed_collisions: np.ndarray | None = (
+            None  # (L, L) link pairs that are never checked, computed on first use
+        )
         # visual
         self.selected: Joint = joints[0]  # currently selected joint on UI
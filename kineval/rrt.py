@@ -1,24 +1,182 @@
-from kineval import Robot, World, RobotConfiguration, Marker
-from kineval.collision import IsPoseCollison
-from pyvistaqt import QtInteractor
+from kineval import (
+    Robot,
+    World,
+    RobotConfiguration,
+    Vec,
+    VecN,
+    IntVec,
+    BoolVec,
+)
+from kineval.collision import IsEdgeCollision, IsPoseCollisionBatch
+from kineval.path_smoothing import SmoothPath
+from kineval.nearest_neighbors import (
+    NearestNeighborIndex,
+    WrappedDimensions,
+    ConfigDifference,
+)
 from enum import Enum
-from typing import Literal
+from typing import Callable, Literal
 import numpy as np
+import time
 
 
-class RRTNode:
-    """A single node of an RRT tree."""
+class RRTTree:
+    """A single RRT tree. Nodes are indices into growable arrays of configuration
+    vectors and parent indices."""
 
-    def __init__(self, configuration: RobotConfiguration):
+    def __init__(self, wrapped: BoolVec, capacity: int = 256):
+        """Creates an empty tree.
+
+        Args:
+            wrapped (BoolVec): (dof,) mask of configuration entries that wrap around,
+                from `WrappedDimensions`.
+            capacity (int, optional): Initial number of nodes before the arrays grow.
+                Defaults to 256.
+        """
         # structure
-        self.configuration: RobotConfiguration = configuration
-        self.parent: RRTNode = None
+        self.configurations: VecN = np.empty(
+            (capacity, len(wrapped)), float
+        )  # configuration vector of each node
+        self.parents: IntVec = np.full(capacity, -1, int)  # parent of each node, or -1
+        self.checked: BoolVec = np.ones(
+            capacity, bool
+        )  # whether the edge to the parent is known to be collision free
+        self.size: int = 0  # number of nodes
+        self.wrapped: BoolVec = np.array(wrapped, bool)  # wrapping entries
+        self.index: NearestNeighborIndex = NearestNeighborIndex(
+            wrapped
+        )  # nearest neighbor index of the configurations
         # visual
-        self.marker: Marker = None
+        self.reported: int = 0  # number of nodes reported to the observer
+
+    def __len__(self) -> int:
+        return self.size
+
+    def add(self, configuration: Vec, parent: int = -1, checked: bool = True) -> int:
+        """Adds a node to the tree.
+
+        Args:
+            configuration (Vec): Configuration vector of the node.
+            parent (int, optional): Parent node. Defaults to -1 (no parent).
+            checked (bool, optional): Whether the edge to the parent is known to be
+                collision free. Defaults to True.
+
+        Returns:
+            int: The added node.
+        """
+        if self.size == len(self.parents):
+            self.configurations = np.concatenate(
+                [self.configurations, np.empty_like(self.configurations)]
+            )
+            self.parents = np.concatenate(
+                [self.parents, np.full_like(self.parents, -1)]
+            )
+            self.checked = np.concatenate([self.checked, np.ones_like(self.checked)])
+        self.configurations[self.size] = configuration
+        self.parents[self.size] = parent
+        self.checked[self.size] = checked
+        self.index.add(configuration)
+        self.size += 1
+        return self.size - 1
+
+    def nearest(self, configuration: Vec) -> tuple[int, float]:
+        """Finds the node closest to a configuration vector.
+
+        Args:
+            configuration (Vec): Configuration vector to search from.
+
+        Returns:
+            tuple[int, float]: The closest node and its distance.
+        """
+        return self.index.nearest(configuration)
+
+    def within(self, configuration: Vec, radius: float) -> IntVec:
+        """Finds the nodes within `radius` of a configuration vector.
+
+        Args:
+            configuration (Vec): Configuration vector to search from.
+            radius (float): Largest distance of returned nodes.
+
+        Returns:
+            IntVec: The nodes, in no particular order.
+        """
+        return self.index.within(configuration, radius)
+
+    def clear(self):
+        """Removes all nodes."""
+        self.size = 0
+        self.index = NearestNeighborIndex(self.wrapped)
+        self.reported = 0
+
+    def prune(self, node: int):
+        """Removes a node and all of its descendants. The remaining nodes keep their
+        order but are renumbered.
+
+        Args:
+            node (int): Root of the subtree to remove.
+        """
+        # parents are always added before their children
+        removed = np.zeros(self.size, bool)
+        removed[node] = True
+        for child in range(node + 1, self.size):
+            parent = self.parents[child]
+            removed[child] = parent >= 0 and removed[parent]
+        keep = np.flatnonzero(~removed)
+        renumber = np.full(self.size, -1, int)
+        renumber[keep] = np.arange(len(keep))
+
+        configurations = self.configurations[keep]
+        parents = self.parents[keep]
+        checked = self.checked[keep]
+        self.clear()
+        for configuration, parent, check in zip(configurations, parents, checked):
+            self.add(configuration, renumber[parent] if parent >= 0 else -1, check)
+
+    def branch(self, node: int) -> IntVec:
+        """Returns the nodes from `node` up to the root of the tree.
+
+        Args:
+            node (int): Node to start from.
+
+        Returns:
+            IntVec: The nodes, starting with `node` and ending with the root.
+        """
+        nodes = []
+        while node >= 0:
+            nodes.append(node)
+            node = self.parents[node]
+        return np.array(nodes, int)
+
+
+class RRTObserver:
+    """Receives the growth of RRT trees, for example to draw them. Every method does
+    nothing unless overridden."""
+
+    def onVertices(self, tree: RRTTree, nodes: IntVec):
+        """Called with the nodes added to a tree since the last call. The edges of the
+        new nodes go to `tree.parents[nodes]`.
+
+        Args:
+            tree (RRTTree): Tree the nodes were added to.
+            nodes (IntVec): The new nodes.
+        """
+
+    def onPath(self, path: VecN):
+        """Called once a path is found, and again whenever an anytime planner finds a
+        better one.
+
+        Args:
+            path (VecN): (P, dof) configuration vectors from start to goal.
+        """
+
+    def onClear(self):
+        """Called when the reported vertices are outdated, for example because an
+        anytime planner rewired its tree. All vertices are reported again next."""
 
 
 class RRTInfo:
-    """A struct for storing the RRT trees and other info."""
+    """A struct for storing the RRT trees and other info. Planning does not need a
+    window, drawing is left to the optional observer."""
 
     class RRTState(Enum):
         ITERATING = 0
@@ -30,65 +188,113 @@ class RRTInfo:
         self,
         robot: Robot,
         world: World,
-        plotter: QtInteractor,
         stepsize: float,
         start: RobotConfiguration,
         goal: RobotConfiguration,
+        edge_resolution: float = 0.1,
+        observer: RRTObserver | None = None,
+        smoothing_iterations: int = 100,
+        spline: bool = False,
+        lazy: bool = False,
     ):
         self.robot: Robot = robot
         self.world: World = world
-        self.plotter: QtInteractor = plotter
+        self.observer: RRTObserver | None = observer  # receives new vertices and path
+        self.path_reported: bool = False  # whether the path was reported to observer
+        self.pruned: bool = False  # whether nodes were removed since the last report
         self.stepsize: float = stepsize
-        self.treeA: list[RRTNode] = []
-        self.treeB: list[RRTNode] = []
-        self.path: list[RRTNode] = []
-        self.start: RRTNode = self.addVertex(start, "A")
-        self.goal: RRTNode = self.addVertex(goal, "B")
+        self.edge_resolution: float = edge_resolution  # collision check spacing
+        self.lazy: bool = lazy  # whether to only check edges of candidate paths
+        self.smoothing_iterations: int = (
+            smoothing_iterations  # shortcut attempts on the found path, 0 to disable
+        )
+        self.spline: bool = spline  # whether to fit a spline through the found path
+        self.path_smoothed: bool = False  # whether the found path was smoothed
+        self.wrapped: BoolVec = WrappedDimensions(robot)  # angles without limits
+        self.treeA: RRTTree = RRTTree(self.wrapped)
+        self.treeB: RRTTree = RRTTree(self.wrapped)
+        self.start_tree: RRTTree = self.treeA  # tree rooted at the start
+        self.path: VecN = np.zeros(
+            (0, len(self.wrapped)), float
+        )  # configuration vectors from start to goal
+        self.start: int = self.addVertex(start.asVec(), "A")
+        self.goal: int = self.addVertex(goal.asVec(), "B")
         self.steps: int = 0
+        self.started: float | None = None  # perf_counter time of the first step
+        self.elapsed: float = 0.0  # wall time from the first to the last step
         self.status: RRTInfo.RRTState = RRTInfo.RRTState.ITERATING
 
     def addVertex(
-        self, configuration: RobotConfiguration, tree: Literal["A", "B"]
-    ) -> RRTNode:
-        """Adds a new node to the RRT tree. Additionally adds a new marker to the world.
+        self, configuration: Vec, tree: Literal["A", "B"], checked: bool = True
+    ) -> int:
+        """Adds a new node to the RRT tree. The observer is told about it by the next
+        `notifyObserver`.
 
         Args:
-            configuration (RobotConfiguration): The configuration of the new node.
+            configuration (Vec): The configuration vector of the new node.
             tree (Literal["A", "B"]): Whether to add the vertex to tree A or B.
+            checked (bool, optional): Whether the edge to the node will be known to be
+                collision free. Defaults to True.
 
         Returns:
-            RRTNode: The added node.
+            int: The added node.
         """
-        # add node
-        node = RRTNode(configuration)
         if tree == "A":
-            self.treeA.append(node)
+            return self.treeA.add(configuration, checked=checked)
         elif tree == "B":
-            self.treeB.append(node)
-        else:
-            raise ValueError("Argument 'tree' must be either 'A' or 'B'.")
+            return self.treeB.add(configuration, checked=checked)
+        raise ValueError("Argument 'tree' must be either 'A' or 'B'.")
 
-        # add marker
-        node.marker = self.world.addMarker(
-            [*configuration.base_position, 1.0], self.plotter
-        )
+    def addEdge(self, node_from: int, node_to: int, tree: Literal["A", "B"]):
+        """Creates a directed edge from node_from to node_to.
 
-        return node
+        Args:
+            node_from (int): Parent node.
+            node_to (int): Child node.
+            tree (Literal["A", "B"]): Whether the nodes are in tree A or B.
+        """
+        (self.treeA if tree == "A" else self.treeB).parents[node_to] = node_from
 
-    def addEdge(self, node_from: RRTNode, node_to: RRTNode):
-        """Creates a directed edge from node_from to node_to.
+    def removeSubtree(self, node: int, tree: Literal["A", "B"]):
+        """Removes a node and its descendants from the RRT tree. Other nodes of the
+        tree are renumbered, and the observer is told to redraw.
 
         Args:
-            node_from (RRTNode): Parent node.
-            node_to (RRTNode): Child node.
+            node (int): Root of the subtree to remove.
+            tree (Literal["A", "B"]): Whether the node is in tree A or B.
         """
-        node_to.parent = node_from
+        (self.treeA if tree == "A" else self.treeB).prune(node)
+        self.pruned = True
 
     def swapTrees(self):
         """Swaps the two RRT trees so that treeA points to treeB
         and vice versa."""
         self.treeA, self.treeB = self.treeB, self.treeA
 
+    def notifyObserver(self):
+        """Reports the vertices added since the last call, and the path once it is
+        found, to the observer."""
+        if self.observer is None:
+            return
+        if self.pruned:
+            self.observer.onClear()
+            self.treeA.reported = 0
+            self.treeB.reported = 0
+            self.pruned = False
+        for tree in (self.treeA, self.treeB):
+            if tree.reported < tree.size:
+                self.observer.onVertices(tree, np.arange(tree.reported, tree.size))
+                tree.reported = tree.size
+        if len(self.path) > 0 and not self.path_reported:
+            self.observer.onPath(self.path)
+            self.path_reported = True
+
+    def __getstate__(self) -> dict:
+        """Drops the observer, so the planner can be pickled without its visuals."""
+        state = self.__dict__.copy()
+        state["observer"] = None
+        return state
+
 
 def StepRRT(info: RRTInfo):
     """Runs a single iteration of RRT-connect.
@@ -97,7 +303,11 @@ def StepRRT(info: RRTInfo):
         info (RRTInfo): Variables and info related to RRT.
     """
     # NOTE: Do NOT remove the following lines of code
-    if info is None or info.status != RRTInfo.RRTState.ITERATING:
+    if info is None:
+        return
+    SmoothPathRRT(info)
+    info.notifyObserver()
+    if info.status != RRTInfo.RRTState.ITERATING:
         return
 
     # TODO: YOUR CODE HERE
@@ -111,6 +321,7 @@ def StepRRT(info: RRTInfo):
     if (
         status != RRTInfo.RRTState.TRAPPED
         and ConnectRRT(info, qnew, "B") == RRTInfo.RRTState.REACHED
+        and (not info.lazy or ValidatePathRRT(info))
     ):
         GeneratePathRRT(info)
         info.status = RRTInfo.RRTState.REACHED
@@ -119,6 +330,73 @@ def StepRRT(info: RRTInfo):
     info.steps += 1
 
 
+def StepRRTBudget(
+    info: RRTInfo, budget: float, step: Callable[[RRTInfo], None] = None
+) -> int:
+    """Runs iterations of a planner until `budget` seconds have passed or planning
+    stops. At least one iteration runs, so the observer is always notified.
+
+    Args:
+        info (RRTInfo): Variables and info related to RRT.
+        budget (float): Time to spend planning, in seconds.
+        step (Callable[[RRTInfo], None], optional): Function running one iteration of
+            the planner of `info`. Defaults to None (`StepRRT`).
+
+    Returns:
+        int: Number of iterations run.
+    """
+    # NOTE: This function is already written for you
+    if info is None:
+        return 0
+    start = time.perf_counter()
+    if info.started is None:
+        info.started = start
+    steps = info.steps
+    step = StepRRT if step is None else step
+
+    step(info)
+    while (
+        info.status == RRTInfo.RRTState.ITERATING
+        and time.perf_counter() - start < budget
+    ):
+        step(info)
+
+    # let the planner finish up right away, such as smoothing and reporting the path
+    if info.status != RRTInfo.RRTState.ITERATING and info.steps > steps:
+        step(info)
+
+    # track the achieved planning rate
+    if info.steps > steps:
+        info.elapsed = time.perf_counter() - info.started
+    return info.steps - steps
+
+
+def SmoothPathRRT(info: RRTInfo):
+    """Shortcuts, and optionally splines, the found path once, before it is reported
+    to the observer.
+
+    Args:
+        info (RRTInfo): Variables and info related to RRT.
+    """
+    # NOTE: This function is already written for you
+    if info.path_smoothed or info.status != RRTInfo.RRTState.REACHED:
+        return
+    info.path_smoothed = True
+    if len(info.path) < 3:
+        return
+    info.path = SmoothPath(
+        info.robot,
+        info.world,
+        info.path,
+        info.wrapped,
+        info.smoothing_iterations,
+        info.spline,
+        info.stepsize,
+        info.edge_resolution,
+        np.random.default_rng(np.random.randint(2**31)),
+    )
+
+
 # TODO: YOUR CODE HERE
 # Implement other functions that you think are necessary, such as
 # ExtendRRT, ConnectRRT, GeneratePathRRT, RandomConfig, FindNearest
@@ -127,35 +405,41 @@ def StepRRT(info: RRTInfo):
 
 # FIXME: remove instructor solution below
 def ExtendRRT(
-    info: RRTInfo, qrand: RobotConfiguration, tree: Literal["A", "B"]
-) -> tuple[RRTInfo.RRTState, RRTNode]:
-    node_near, dnear = FindNearest(info.treeA if tree == "A" else info.treeB, qrand)
+    info: RRTInfo, qrand: Vec, tree: Literal["A", "B"]
+) -> tuple[RRTInfo.RRTState, Vec]:
+    node_near, dnear = FindNearest(info, qrand, tree)
+    qnear = (info.treeA if tree == "A" else info.treeB).configurations[node_near]
+    # go the short way around for angles without limits
+    qdelta = ConfigDifference(qnear, qrand, info.wrapped)
 
     # create new config towards qrand
-    if dnear > info.stepsize:
-        qnear_vec = node_near.configuration.asVec()
-        qrand_vec = qrand.asVec()
-        # move step_size towards qrand from qnear
-        qnew = RobotConfiguration(info.robot).fromVec(
-            qnear_vec + (qrand_vec - qnear_vec) * info.stepsize / dnear
-        )
-    else:
+    reached = dnear <= info.stepsize
+    if reached:
         qnew = qrand
+    else:
+        # move step_size towards qrand from qnear
+        qdelta *= info.stepsize / dnear
+        qnew = qnear + qdelta
 
-    if IsPoseCollison(info.robot, qnew, info.world):
+    # check the whole edge, not only its end, unless edge checks are deferred
+    if info.lazy:
+        collision = IsPoseCollisionBatch(info.robot, qnear + qdelta, info.world)[0]
+    else:
+        collision = IsEdgeCollision(
+            info.robot, qnear, qnear + qdelta, info.world, info.edge_resolution
+        )
+    if collision:
         return RRTInfo.RRTState.TRAPPED, qnew
 
-    node_new = info.addVertex(qnew, tree)
-    info.addEdge(node_near, node_new)
+    node_new = info.addVertex(qnew, tree, checked=not info.lazy)
+    info.addEdge(node_near, node_new, tree)
 
-    if qnew == qrand:
+    if reached:
         return RRTInfo.RRTState.REACHED, qrand
     return RRTInfo.RRTState.ADVANCED, qnew
 
 
-def ConnectRRT(
-    info: RRTInfo, qnew: RobotConfiguration, tree: Literal["A", "B"]
-) -> RRTInfo.RRTState:
+def ConnectRRT(info: RRTInfo, qnew: Vec, tree: Literal["A", "B"]) -> RRTInfo.RRTState:
     status, _ = ExtendRRT(info, qnew, tree)
     while status == RRTInfo.RRTState.ADVANCED:
         status, _ = ExtendRRT(info, qnew, tree)
@@ -164,59 +448,63 @@ def ConnectRRT(
 
 def GeneratePathRRT(info: RRTInfo):
     # make sure treeA contains start
-    if info.treeA[0] != info.start:
+    if info.treeA is not info.start_tree:
         info.swapTrees()
 
-    # get path from node to start
-    node = info.treeA[-1]
-    while node is not None:
-        node.marker.setColor([1, 0, 0])
-        info.path.insert(0, node)
-        node = node.parent
-
-    # add path from node to goal
-    node = info.treeB[-1].parent
-    while node is not None:
-        node.marker.setColor([1, 0, 0])
-        info.path.append(node)
-        node = node.parent
-
-
-def RandomConfig(info: RRTInfo) -> RobotConfiguration:
-    # create a config for the robot
-    qrand = RobotConfiguration(info.robot)
+    # path from start to the newest node of treeA, then from the newest node of treeB
+    # (at the same configuration) to goal
+    branchA = info.treeA.branch(len(info.treeA) - 1)[::-1]
+    branchB = info.treeB.branch(len(info.treeB) - 1)[1:]
+    info.path = np.concatenate(
+        [info.treeA.configurations[branchA], info.treeB.configurations[branchB]]
+    )
+
+
+def ValidatePathRRT(info: RRTInfo) -> bool:
+    # the candidate path joins the newest nodes of both trees, check its unchecked
+    # edges from the roots outwards and cut each tree at its first collision
+    valid = True
+    for name in ("A", "B"):
+        tree = info.treeA if name == "A" else info.treeB
+        branch = tree.branch(len(tree) - 1)[::-1]
+        for node in branch[~tree.checked[branch]]:
+            qparent = tree.configurations[tree.parents[node]]
+            qdelta = ConfigDifference(qparent, tree.configurations[node], info.wrapped)
+            if IsEdgeCollision(
+                info.robot, qparent, qparent + qdelta, info.world, info.edge_resolution
+            ):
+                info.removeSubtree(node, name)
+                valid = False
+                break
+            tree.checked[node] = True
+    return valid
+
+
+def RandomConfig(info: RRTInfo) -> Vec:
+    # create a config vector for the robot
+    qrand = np.empty(len(info.wrapped), float)
     # randomize base position and rotation
     x0, x1 = info.world.bounds[0, :]
     y0, y1 = info.world.bounds[1, :]
-    qrand.base_position = np.random.rand(2) * [x1 - x0, y1 - y0] + [x0, y0]
-    qrand.base_rotation = 2 * np.pi * np.random.rand() - np.pi
+    qrand[0:2] = np.random.rand(2) * [x1 - x0, y1 - y0] + [x0, y0]
+    qrand[2] = 2 * np.pi * np.random.rand() - np.pi
     # randomize joint rotations
-    for joint in info.robot.joints:
+    for i, joint in enumerate(info.robot.joints):
         if joint.limits is None:
-            qrand.joint_configs[joint.name] = 2 * np.pi * np.random.rand() - np.pi
+            qrand[i + 3] = 2 * np.pi * np.random.rand() - np.pi
         else:
             lower, upper = joint.limits
-            qrand.joint_configs[joint.name] = (upper - lower) * np.random.rand() + lower
+            qrand[i + 3] = (upper - lower) * np.random.rand() + lower
     return qrand
 
 
 def FindNearest(
-    tree: list[RRTNode], configuration: RobotConfiguration
-) -> tuple[RRTNode, float]:
-    qnear = tree[0]
-    dnear = float("inf")
-
-    # search for closest node
-    for node in tree:
-        dnode = ConfigDistance(configuration, node.configuration)
-        if dnode < dnear:
-            dnear = dnode
-            qnear = node
-
-    # return closest node and its distance
-    return qnear, dnear
+    info: RRTInfo, configuration: Vec, tree: Literal["A", "B"]
+) -> tuple[int, float]:
+    # search the nearest neighbor index of the tree
+    return (info.treeA if tree == "A" else info.treeB).nearest(configuration)
 
 
-def ConfigDistance(config1: RobotConfiguration, config2: RobotConfiguration) -> float:
-    # return the distance of these vectors
-    return np.linalg.norm(config1.asVec() - config2.asVec())
+def ConfigDistance(config1: Vec, config2: Vec, wrapped: BoolVec) -> float:
+    # return the distance of these vectors, the short way around for wrapping angles
+    return np.linalg.norm(ConfigDifference(config1, config2, wrapped))
@@ -0,0 +1,251 @@
+from kineval import RRTInfo, RRTObserver, StepRRTBudget, VecN, IntVec
+from kineval.rrt import RRTTree
+import multiprocessing as mp
+import numpy as np
+import queue
+import time
+
+
+class RRTProgress:
+    """A message from a planner process with everything that changed since the last
+    message."""
+
+    def __init__(
+        self,
+        planner: int,
+        steps: int,
+        elapsed: float,
+        status: RRTInfo.RRTState,
+        vertices: list[tuple[int, VecN, IntVec]],
+        path: VecN,
+        cleared: bool = False,
+    ):
+        self.planner: int = planner  # index of the sending planner
+        self.steps: int = steps  # iterations run so far
+        self.elapsed: float = elapsed  # wall time from the first to the last step
+        self.status: RRTInfo.RRTState = status  # planner status
+        self.vertices: list[tuple[int, VecN, IntVec]] = (
+            vertices  # new nodes as (tree, configurations, parents), tree 0 is start
+        )
+        self.path: VecN = path  # configuration vectors from start to goal, if found
+        self.cleared: bool = (
+            cleared  # whether the trees were pruned, so `vertices` replace all nodes
+        )
+
+
+class ProgressCollector(RRTObserver):
+    """Collects the vertices added by a planner until they are sent."""
+
+    def __init__(self, info: RRTInfo, planner: int = 0):
+        self.info: RRTInfo = info  # planner to collect from
+        self.planner: int = planner  # index of the planner
+        self.vertices: list[tuple[int, VecN, IntVec]] = []  # unsent vertices
+        self.cleared: bool = False  # whether the trees were pruned since last sent
+
+    def onVertices(self, tree: RRTTree, nodes: IntVec):
+        side = 0 if tree is self.info.start_tree else 1
+        self.vertices.append(
+            (side, tree.configurations[nodes].copy(), tree.parents[nodes].copy())
+        )
+
+    def onClear(self):
+        self.vertices = []
+        self.cleared = True
+
+    def collect(self, send_vertices: bool = True) -> RRTProgress:
+        """Returns the progress since the last call.
+
+        Args:
+            send_vertices (bool, optional): Whether to send the collected vertices.
+                Otherwise they are kept for a later call. Defaults to True.
+
+        Returns:
+            RRTProgress: Message to send to the main process.
+        """
+        self.info.notifyObserver()
+        progress = RRTProgress(
+            self.planner,
+            self.info.steps,
+            self.info.elapsed,
+            self.info.status,
+            self.vertices if send_vertices else [],
+            self.info.path,
+            self.cleared and send_vertices,
+        )
+        if send_vertices:
+            self.vertices = []
+            self.cleared = False
+        return progress
+
+
+def RunRRTProcess(
+    info: RRTInfo,
+    progress: mp.Queue,
+    stop: mp.Event,
+    report_interval: float,
+    planner: int = 0,
+    seed: int | None = None,
+    stream: bool = True,
+):
+    """Plans until a path is found or `stop` is set, sending progress every
+    `report_interval` seconds. Finding a path sets `stop`, which cancels the other
+    planners sharing it. Runs in the planner process.
+
+    Args:
+        info (RRTInfo): Planner to run, unpickled without visuals.
+        progress (mp.Queue): Queue to send `RRTProgress` messages to.
+        stop (mp.Event): Cancels planning when set.
+        report_interval (float): Time between messages, in seconds.
+        planner (int, optional): Index of the planner. Defaults to 0.
+        seed (int | None, optional): Seed of the random configurations. Defaults to
+            None.
+        stream (bool, optional): Whether to send new vertices with every message.
+            Otherwise all vertices are sent once a path is found. Defaults to True.
+    """
+    np.random.seed(seed)
+    collector = ProgressCollector(info, planner)
+    info.observer = collector
+    # the main process already has the vertices added before planning started
+    for tree in (info.treeA, info.treeB):
+        tree.reported = tree.size
+    while not stop.is_set():
+        StepRRTBudget(info, report_interval)
+        if info.status != RRTInfo.RRTState.ITERATING:
+            stop.set()
+            progress.put(collector.collect())
+            break
+        progress.put(collector.collect(stream))
+
+
+class RRTProcess:
+    """Runs RRT in separate processes on a pure-data copy of the robot and world. The
+    progress is mirrored into the given RRTInfo, which can be drawn and traversed as if
+    it was planned in this process.
+
+    With several planners, independently seeded copies race as a portfolio. The first
+    path found is kept and the other planners are cancelled, which cuts the long tail
+    of unlucky seeds. Only the winning trees are mirrored."""
+
+    def __init__(
+        self,
+        info: RRTInfo,
+        report_interval: float = 0.05,
+        n_planners: int = 1,
+        seed: int | None = None,
+    ):
+        """Starts planning in new processes.
+
+        Args:
+            info (RRTInfo): Planner to run. It is copied to the planner processes and
+                then only receives progress, so it must not be stepped here.
+            report_interval (float, optional): Time between progress messages, in
+                seconds. Defaults to 0.05.
+            n_planners (int, optional): Number of planners racing for the first path.
+                Defaults to 1.
+            seed (int | None, optional): Seed the planner seeds are derived from.
+                Defaults to None (random).
+        """
+        # spawn a fresh interpreter, forking would copy the window and its threads
+        context = mp.get_context("spawn")
+        seeds = np.random.SeedSequence(seed).generate_state(n_planners)
+        self.info: RRTInfo = info  # mirror of the winning planner
+        self.progress: mp.Queue = context.Queue()  # messages from planner processes
+        self.stop_event: mp.Event = context.Event()  # cancels planning when set
+        self.steps: list[int] = [0] * n_planners  # iterations run by each planner
+        self.winner: int | None = None  # index of the planner that found the path
+        self.processes: list[mp.Process] = [
+            context.Process(
+                target=RunRRTProcess,
+                args=(
+                    info,
+                    self.progress,
+                    self.stop_event,
+                    report_interval,
+                    i,
+                    int(seeds[i]),
+                    n_planners == 1,
+                ),
+                daemon=True,
+            )
+            for i in range(n_planners)
+        ]  # planner processes
+        for process in self.processes:
+            process.start()
+
+    def poll(self) -> bool:
+        """Applies all received progress to the mirrored RRTInfo, without waiting.
+
+        Returns:
+            bool: Whether a planner may still send progress.
+        """
+        alive = any(process.is_alive() for process in self.processes)
+        while True:
+            try:
+                progress: RRTProgress = self.progress.get_nowait()
+            except queue.Empty:
+                break
+            self.apply(progress)
+        return alive or not self.progress.empty()
+
+    def wait(self, timeout: float | None = None) -> RRTInfo.RRTState:
+        """Polls until a path is found, every planner stopped or `timeout` passed.
+
+        Args:
+            timeout (float | None, optional): Longest time to wait, in seconds.
+                Defaults to None (no limit).
+
+        Returns:
+            RRTInfo.RRTState: Status of the mirrored RRTInfo.
+        """
+        start = time.perf_counter()
+        while (
+            self.poll()
+            and self.info.status == RRTInfo.RRTState.ITERATING
+            and (timeout is None or time.perf_counter() - start < timeout)
+        ):
+            time.sleep(0.01)
+        return self.info.status
+
+    def apply(self, progress: RRTProgress):
+        """Adds the new vertices and copies the status of a progress message. Once a
+        planner has found a path, messages from the others are ignored.
+
+        Args:
+            progress (RRTProgress): Message from a planner process.
+        """
+        if self.winner is not None:
+            return
+        self.steps[progress.planner] = progress.steps
+        self.info.steps = sum(self.steps)
+        self.info.elapsed = max(self.info.elapsed, progress.elapsed)
+        if progress.status != RRTInfo.RRTState.ITERATING:
+            self.winner = progress.planner
+            self.stop_event.set()
+
+        goal_tree = (
+            self.info.treeB
+            if self.info.treeA is self.info.start_tree
+            else self.info.treeA
+        )
+        if progress.cleared:
+            self.info.start_tree.clear()
+            goal_tree.clear()
+            self.info.pruned = True
+        for side, configurations, parents in progress.vertices:
+            tree = self.info.start_tree if side == 0 else goal_tree
+            for configuration, parent in zip(configurations, parents):
+                tree.add(configuration, parent)
+        self.info.status = progress.status
+        self.info.path = progress.path
+
+    def stop(self):
+        """Cancels planning and waits for the planner processes to exit."""
+        self.stop_event.set()
+        # drain the queue so no process is blocked flushing it
+        while any(process.is_alive() for process in self.processes):
+            try:
+                self.progress.get(timeout=0.1)
+            except queue.Empty:
+                pass
+        for process in self.processes:
+            process.join()
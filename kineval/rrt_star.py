@@ -0,0 +1,423 @@
+from kineval import (
+    Robot,
+    World,
+    RobotConfiguration,
+    RRTInfo,
+    RRTObserver,
+    Vec,
+    VecN,
+    BoolVec,
+)
+from kineval.collision import IsEdgeCollision
+from kineval.nearest_neighbors import WrappedDimensions, ConfigDifference
+from kineval.rrt import RRTTree, RandomConfig
+from scipy.special import gammaln
+import numpy as np
+import time
+
+
+class RRTStarInfo:
+    """A struct for storing the RRT* tree and other info. Unlike RRT-connect, planning
+    goes on after the first path is found and keeps improving it until the time budget
+    is spent. The status is REACHED once the budget is spent with a path, and TRAPPED
+    if no path was found."""
+
+    def __init__(
+        self,
+        robot: Robot,
+        world: World,
+        stepsize: float,
+        start: RobotConfiguration,
+        goal: RobotConfiguration,
+        time_budget: float = 10.0,
+        goal_bias: float = 0.05,
+        rewire_gamma: float | None = None,
+        rewire_radius: float | None = None,
+        edge_resolution: float = 0.1,
+        observer: RRTObserver | None = None,
+    ):
+        """Initializes the tree at the start configuration.
+
+        Args:
+            robot (Robot): Robot to plan for.
+            world (World): World the robot is in.
+            stepsize (float): Longest edge added to the tree.
+            start (RobotConfiguration): Start configuration.
+            goal (RobotConfiguration): Goal configuration.
+            time_budget (float, optional): Planning time before the best path is final,
+                in seconds. Defaults to 10.0.
+            goal_bias (float, optional): Chance of sampling the goal. Defaults to
+                0.05.
+            rewire_gamma (float | None, optional): Scale of the shrinking rewiring
+                radius. Defaults to None (the smallest scale for which RRT* converges
+                to the shortest path, from the volume of the sampled space).
+            rewire_radius (float | None, optional): Largest rewiring radius, which
+                bounds the work per iteration while the tree is small. Defaults to
+                None (4 step sizes).
+            edge_resolution (float, optional): Largest distance any point on the robot
+                may move between checked configurations. Defaults to 0.1.
+            observer (RRTObserver | None, optional): Receives new vertices and paths.
+                Defaults to None.
+        """
+        self.robot: Robot = robot
+        self.world: World = world
+        self.observer: RRTObserver | None = observer  # receives new vertices and path
+        self.path_reported: bool = False  # whether the best path was reported
+        self.stepsize: float = stepsize
+        self.time_budget: float = time_budget  # planning time before the path is final
+        self.goal_bias: float = goal_bias  # chance of sampling the goal
+        self.rewire_gamma: float = (
+            RewireGamma(robot, world) if rewire_gamma is None else rewire_gamma
+        )  # scale of the rewiring radius
+        self.rewire_radius: float = (
+            4 * stepsize if rewire_radius is None else rewire_radius
+        )  # largest rewiring radius
+        self.edge_resolution: float = edge_resolution  # collision check spacing
+        self.wrapped: BoolVec = WrappedDimensions(robot)  # angles without limits
+        self.tree: RRTTree = RRTTree(self.wrapped)  # tree rooted at the start
+        self.costs: Vec = np.zeros((256), float)  # path length from start to each node
+        self.children: list[list[int]] = []  # child nodes of each node
+        self.goal: Vec = goal.asVec()  # goal configuration vector
+        self.goal_nodes: list[int] = []  # nodes with a collision free edge to goal
+        self.goal_distances: list[float] = []  # length of those edges
+        self.best_cost: float = float("inf")  # length of the best path
+        self.path: VecN = np.zeros(
+            (0, len(self.wrapped)), float
+        )  # best configuration vectors from start to goal
+        self.start: int = self.addVertex(start.asVec(), -1, 0.0)
+        self.steps: int = 0
+        self.started: float | None = None  # perf_counter time of the first step
+        self.elapsed: float = 0.0  # wall time from the first to the last step
+        self.status: RRTInfo.RRTState = RRTInfo.RRTState.ITERATING
+
+    def addVertex(self, configuration: Vec, parent: int, cost: float) -> int:
+        """Adds a new node to the tree.
+
+        Args:
+            configuration (Vec): The configuration vector of the new node.
+            parent (int): Parent node, or -1 for the root.
+            cost (float): Path length from the start to the node.
+
+        Returns:
+            int: The added node.
+        """
+        node = self.tree.add(configuration, parent)
+        if node == len(self.costs):
+            self.costs = np.concatenate([self.costs, np.zeros_like(self.costs)])
+        self.costs[node] = cost
+        self.children.append([])
+        if parent >= 0:
+            self.children[parent].append(node)
+        return node
+
+    def rewire(self, node: int, parent: int, cost: float):
+        """Moves a node to a new parent and updates the costs of its subtree.
+
+        Args:
+            node (int): Node to move.
+            parent (int): New parent node.
+            cost (float): New path length from the start to the node.
+        """
+        self.children[self.tree.parents[node]].remove(node)
+        self.children[parent].append(node)
+        self.tree.parents[node] = parent
+
+        # every descendant gets cheaper by the same amount
+        delta = cost - self.costs[node]
+        stack = [node]
+        while stack:
+            descendant = stack.pop()
+            self.costs[descendant] += delta
+            stack.extend(self.children[descendant])
+
+    def notifyObserver(self):
+        """Reports the vertices added since the last call to the observer. When a
+        better path is found, the rewired tree is reported again before the path."""
+        if self.observer is None:
+            return
+        improved = len(self.path) > 0 and not self.path_reported
+        if improved:
+            self.observer.onClear()
+            self.tree.reported = 0
+        if self.tree.reported < self.tree.size:
+            self.observer.onVertices(
+                self.tree, np.arange(self.tree.reported, self.tree.size)
+            )
+            self.tree.reported = self.tree.size
+        if improved:
+            self.observer.onPath(self.path)
+            self.path_reported = True
+
+    def __getstate__(self) -> dict:
+        """Drops the observer, so the planner can be pickled without its visuals."""
+        state = self.__dict__.copy()
+        state["observer"] = None
+        return state
+
+
+def StepRRTStar(info: RRTStarInfo):
+    """Runs a single iteration of RRT*. Once a path is found, samples are drawn from
+    the informed set of configurations that could still shorten it.
+
+    Args:
+        info (RRTStarInfo): Variables and info related to RRT*.
+    """
+    if info is None:
+        return
+    info.notifyObserver()
+    if info.status != RRTInfo.RRTState.ITERATING:
+        return
+    now = time.perf_counter()
+    if info.started is None:
+        info.started = now
+    if now - info.started >= info.time_budget:
+        info.status = (
+            RRTInfo.RRTState.REACHED if len(info.path) > 0 else RRTInfo.RRTState.TRAPPED
+        )
+        return
+    info.steps += 1
+
+    # steer from the nearest node towards a sample
+    if np.random.rand() < info.goal_bias:
+        qrand = info.goal
+    else:
+        qrand = InformedConfig(info)
+    node_near, dnear = info.tree.nearest(qrand)
+    qnear = info.tree.configurations[node_near]
+    qdelta = ConfigDifference(qnear, qrand, info.wrapped)
+    if dnear > info.stepsize:
+        qdelta *= info.stepsize / dnear
+    qnew = qnear + qdelta
+    if IsEdgeCollision(info.robot, qnear, qnew, info.world, info.edge_resolution):
+        return
+
+    # connect to the neighbor giving the shortest path, trying the cheapest first
+    near = np.union1d(info.tree.within(qnew, RewireRadius(info)), [node_near])
+    differences = ConfigDifference(info.tree.configurations[near], qnew, info.wrapped)
+    distances = np.linalg.norm(differences, axis=1)
+    costs = info.costs[near] + distances
+    for k in np.argsort(costs):
+        qparent = info.tree.configurations[near[k]]
+        if near[k] == node_near or not IsEdgeCollision(
+            info.robot,
+            qparent,
+            qparent + differences[k],
+            info.world,
+            info.edge_resolution,
+        ):
+            parent, cost = near[k], costs[k]
+            break
+    node_new = info.addVertex(qnew, parent, cost)
+
+    # rewire neighbors that get shorter through the new node
+    for k in np.flatnonzero(cost + distances < info.costs[near] - 1e-9):
+        if not IsEdgeCollision(
+            info.robot,
+            qnew,
+            qnew - differences[k],
+            info.world,
+            info.edge_resolution,
+        ):
+            info.rewire(near[k], node_new, cost + distances[k])
+
+    # remember nodes that connect to the goal
+    qgoal = ConfigDifference(qnew, info.goal, info.wrapped)
+    dgoal = np.linalg.norm(qgoal)
+    if dgoal <= info.stepsize and not IsEdgeCollision(
+        info.robot, qnew, qnew + qgoal, info.world, info.edge_resolution
+    ):
+        info.goal_nodes.append(node_new)
+        info.goal_distances.append(dgoal)
+
+    # rewiring may also have shortened paths through earlier goal nodes
+    if info.goal_nodes:
+        totals = info.costs[info.goal_nodes] + info.goal_distances
+        best = np.argmin(totals)
+        if totals[best] < info.best_cost - 1e-9:
+            info.best_cost = float(totals[best])
+            branch = info.tree.branch(info.goal_nodes[best])[::-1]
+            info.path = np.concatenate(
+                [info.tree.configurations[branch], info.goal[np.newaxis]]
+            )
+            info.path_reported = False
+
+
+def RewireRadius(info: RRTStarInfo) -> float:
+    """Returns the radius of neighbors considered for rewiring. It shrinks as the tree
+    grows, as gamma (log n / n)^(1 / dof), but never exceeds `info.rewire_radius`.
+
+    Args:
+        info (RRTStarInfo): Variables and info related to RRT*.
+
+    Returns:
+        float: The radius.
+    """
+    n = len(info.tree) + 1
+    dof = len(info.wrapped)
+    return min(info.rewire_radius, info.rewire_gamma * (np.log(n) / n) ** (1 / dof))
+
+
+def RewireGamma(robot: Robot, world: World) -> float:
+    """Returns the rewiring radius scale of Karaman and Frazzoli for the space sampled
+    by `RandomConfig`, 2 (1 + 1 / d)^(1 / d) (volume / unit ball volume)^(1 / d).
+
+    Args:
+        robot (Robot): Robot to plan for.
+        world (World): World the robot is in.
+
+    Returns:
+        float: The radius scale.
+    """
+    ranges = [
+        *(world.bounds[:, 1] - world.bounds[:, 0]),
+        2 * np.pi,
+        *(
+            2 * np.pi if j.limits is None else j.limits[1] - j.limits[0]
+            for j in robot.joints
+        ),
+    ]
+    ranges = [extent for extent in ranges if extent > 0]  # fixed joints do not count
+    dof = len(ranges)
+    log_volume = np.sum(np.log(ranges))
+    log_ball = 0.5 * dof * np.log(np.pi) - gammaln(0.5 * dof + 1)
+    return float(2 * (1 + 1 / dof) ** (1 / dof) * np.exp((log_volume - log_ball) / dof))
+
+
+def InformedConfig(info: RRTStarInfo, attempts: int = 100, max_images: int = 64) -> Vec:
+    """Samples a configuration uniformly, or once a path is found, from the
+    configurations whose distance to start plus distance to goal is shorter than the
+    path. Other configurations cannot shorten the path. The goal repeats every 2 pi
+    along wrapping entries, so this set is the union of one ellipsoid per image of the
+    goal within reach of the path, taken within 2 pi around start where every
+    configuration appears once.
+
+    Args:
+        info (RRTStarInfo): Variables and info related to RRT*.
+        attempts (int, optional): Ellipsoid samples to try before falling back to
+            uniform sampling, as samples outside the world or joint limits are
+            rejected. Defaults to 100.
+        max_images (int, optional): Largest number of goal images to sample from,
+            beyond which the ellipsoids cover most of the space and uniform sampling is
+            used. Defaults to 64.
+
+    Returns:
+        Vec: The sampled configuration vector.
+    """
+    if not np.isfinite(info.best_cost):
+        return RandomConfig(info)
+    start = info.tree.configurations[info.start]
+    goals = WrappedImages(start, info.goal, info.wrapped, info.best_cost, max_images)
+    if goals is None or len(goals) == 0:
+        return RandomConfig(info)
+
+    # pick ellipsoids by volume, proportional to a * b^(dof - 1) for semi-axes a, b
+    dof = len(start)
+    shortest = np.linalg.norm(goals - start, axis=1)
+    minor = np.sqrt(np.maximum(info.best_cost**2 - shortest**2, 1e-300))
+    volumes = np.exp((dof - 1) * (np.log(minor) - np.log(minor.max())))
+    weights = volumes / volumes.sum()
+
+    # reject samples outside the world bounds and joint limits
+    lower = np.array(
+        [
+            *info.world.bounds[:, 0],
+            -np.inf,
+            *(-np.inf if j.limits is None else j.limits[0] for j in info.robot.joints),
+        ],
+        float,
+    )
+    upper = np.array(
+        [
+            *info.world.bounds[:, 1],
+            np.inf,
+            *(np.inf if j.limits is None else j.limits[1] for j in info.robot.joints),
+        ],
+        float,
+    )
+    for _ in range(attempts):
+        sample = EllipsoidConfig(
+            start, goals[np.random.choice(len(goals), p=weights)], info.best_cost
+        )
+
+        # keep each configuration once, as its image nearest to start
+        if np.any(np.abs(sample - start)[info.wrapped] > np.pi):
+            continue
+
+        # keep samples where ellipsoids overlap less often, so the union is sampled
+        # uniformly
+        covering = np.count_nonzero(
+            np.linalg.norm(sample - start) + np.linalg.norm(goals - sample, axis=1)
+            <= info.best_cost
+        )
+        if np.random.rand() * max(covering, 1) > 1.0:
+            continue
+        if np.all((sample >= lower) & (sample <= upper)):
+            return sample
+    return RandomConfig(info)
+
+
+def WrappedImages(
+    start: Vec,
+    configuration: Vec,
+    wrapped: BoolVec,
+    radius: float,
+    max_images: int | None = None,
+) -> VecN | None:
+    """Returns the images of a configuration, shifted by multiples of 2 pi along
+    wrapping entries, that are closer to start than `radius`.
+
+    Args:
+        start (Vec): Start configuration vector.
+        configuration (Vec): Configuration vector to shift.
+        wrapped (BoolVec): (dof,) mask of wrapping entries, from `WrappedDimensions`.
+        radius (float): Largest distance to start.
+        max_images (int | None, optional): Largest number of images to build, as the
+            number of images grows exponentially with the wrapping entries. Defaults
+            to None (no limit).
+
+    Returns:
+        VecN | None: (K, dof) images of the configuration, the nearest first, or None
+            if there are more than `max_images`.
+    """
+    nearest = start + ConfigDifference(start, configuration, wrapped)
+    images = nearest[np.newaxis]
+    reach = int(np.ceil(radius / (2 * np.pi)))
+    shifts = 2 * np.pi * np.arange(-reach, reach + 1)
+    for i in np.flatnonzero(wrapped):
+        images = np.repeat(images, len(shifts), axis=0)
+        images[:, i] += np.tile(shifts, len(images) // len(shifts))
+        images = images[np.linalg.norm(images - start, axis=1) < radius]
+        # unshifted images stay within the radius, so the count never shrinks
+        if max_images is not None and len(images) > max_images:
+            return None
+    return images[np.argsort(np.linalg.norm(images - start, axis=1))]
+
+
+def EllipsoidConfig(start: Vec, goal: Vec, cost: float) -> Vec:
+    """Samples uniformly from the ellipsoid of vectors whose distance to `start` plus
+    distance to `goal` is at most `cost`.
+
+    Args:
+        start (Vec): First focus.
+        goal (Vec): Second focus.
+        cost (float): Largest sum of distances, at least the distance between the foci.
+
+    Returns:
+        Vec: The sampled vector.
+    """
+    dof = len(start)
+    shortest = np.linalg.norm(goal - start)
+    rotation = np.identity(dof)
+    if shortest > 1e-9:
+        # rotation taking the first axis to the start-goal line
+        axis = (goal - start) / shortest
+        u, _, vt = np.linalg.svd(np.outer(axis, np.eye(dof)[0]))
+        signs = np.ones(dof, float)
+        signs[-1] = np.linalg.det(u) * np.linalg.det(vt)
+        rotation = u @ np.diag(signs) @ vt
+    radii = np.full(dof, 0.5 * np.sqrt(max(cost**2 - shortest**2, 0.0)), float)
+    radii[0] = 0.5 * cost
+
+    ball = np.random.randn(dof)
+    ball *= np.random.rand() ** (1 / dof) / np.linalg.norm(ball)
+    return 0.5 * (start + goal) + rotation @ (radii * ball)
@@ -0,0 +1,215 @@
+from kineval import Robot, Link, VecN
+import hashlib
+import itertools
+import os
+from scipy.spatial import ConvexHull
+import numpy as np
+import pyvista as pv
+
+SPHERE_CACHE_DIR = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), ".sphere_cache"
+)  # default directory of fitted spheres
+
+
+def FitRobotSpheres(
+    robot: Robot,
+    n_spheres: int = 8,
+    cache_dir: str | None = SPHERE_CACHE_DIR,
+):
+    """Sets `Link.spheres` of every link with a surface mesh. Fitted spheres are loaded
+    from and saved to `cache_dir`, keyed by a hash of the mesh, so each mesh is only
+    fitted once.
+
+    Args:
+        robot (Robot): Robot to fit spheres for.
+        n_spheres (int, optional): Maximum number of spheres per link. Defaults to 8.
+        cache_dir (str | None, optional): Directory of cached spheres, or None to
+            always fit. Defaults to SPHERE_CACHE_DIR.
+    """
+    for link in robot.links:
+        link.spheres = LoadLinkSpheres(link, n_spheres, cache_dir)
+
+
+def LoadLinkSpheres(
+    link: Link, n_spheres: int = 8, cache_dir: str | None = SPHERE_CACHE_DIR
+) -> VecN | None:
+    """Returns spheres that bound the link geometry, from the cache if possible. The
+    spheres cover the whole surface and the enclosed volume, or the convex hull of
+    meshes that are not closed.
+
+    Args:
+        link (Link): Link to fit spheres for.
+        n_spheres (int, optional): Maximum number of spheres. Defaults to 8.
+        cache_dir (str | None, optional): Directory of cached spheres, or None to
+            always fit. Defaults to SPHERE_CACHE_DIR.
+
+    Returns:
+        VecN | None: (K, 4) sphere centers and radii in the link frame, or None if the
+            link has no surface.
+    """
+    mesh = pv.wrap(link.geom.GetMapper().GetInput()).extract_surface().triangulate()
+    if mesh.n_points == 0 or mesh.n_cells == 0:
+        return None
+    faces = mesh.faces.reshape(-1, 4)[:, 1:]
+
+    # look for spheres fitted to the same mesh
+    digest = hashlib.sha1(np.ascontiguousarray(mesh.points, np.float64).tobytes())
+    digest.update(np.ascontiguousarray(faces, np.int64).tobytes())
+    path = (
+        None
+        if cache_dir is None
+        else os.path.join(cache_dir, f"{digest.hexdigest()}_{n_spheres}_v2.npz")
+    )
+    if path is not None and os.path.exists(path):
+        return np.load(path)["spheres"]
+
+    vertices = np.asarray(mesh.points, float)
+    spacing = np.max(np.ptp(vertices, axis=0)) / 32
+    # open meshes have no inside, so their convex hull is filled instead
+    solid = mesh.clean()
+    if solid.n_open_edges > 0:
+        hull = ConvexHull(vertices, qhull_options="QJ")
+        solid = pv.PolyData(
+            hull.points, np.insert(hull.simplices, 0, 3, axis=1).ravel()
+        )
+    # every point inside is either in an enclosed cell or within half a cell diagonal
+    # of the surface, so padding the spheres by it covers the volume
+    pieces = [SubdivideTriangles(vertices[faces], spacing)]
+    if solid.n_cells > 0:
+        pieces.append(EnclosedCells(solid, spacing))
+    spheres = FitSpheres(pieces, n_spheres, spacing * np.sqrt(3) / 2)
+    if path is not None:
+        os.makedirs(cache_dir, exist_ok=True)
+        np.savez(path, spheres=spheres)
+    return spheres
+
+
+def SubdivideTriangles(triangles: np.ndarray, max_edge: float) -> np.ndarray:
+    """Splits triangles into four at their edge midpoints until no edge is longer
+    than `max_edge`.
+
+    Args:
+        triangles (np.ndarray): (T, 3, 3) triangle corners.
+        max_edge (float): Longest allowed edge.
+
+    Returns:
+        np.ndarray: (T', 3, 3) corners of triangles covering the same surface.
+    """
+    done = []
+    while len(triangles) > 0:
+        edges = np.linalg.norm(triangles - np.roll(triangles, 1, axis=1), axis=2)
+        small = np.max(edges, axis=1) <= max_edge
+        done.append(triangles[small])
+        a, b, c = (triangles[~small, i] for i in range(3))
+        ab, bc, ca = (a + b) / 2, (b + c) / 2, (c + a) / 2
+        triangles = np.concatenate(
+            [
+                np.stack(corners, axis=1)
+                for corners in ((a, ab, ca), (ab, b, bc), (ca, bc, c), (ab, bc, ca))
+            ]
+        )
+    return np.concatenate(done)
+
+
+def EnclosedCells(mesh: pv.PolyData, spacing: float) -> np.ndarray:
+    """Returns the cells of a grid over the mesh bounds whose centers are enclosed by
+    the mesh.
+
+    Args:
+        mesh (pv.PolyData): Closed triangle mesh.
+        spacing (float): Edge length of the cubic cells.
+
+    Returns:
+        np.ndarray: (C, 8, 3) corners of the enclosed cells.
+    """
+    bounds = np.reshape(mesh.bounds, (3, 2))
+    counts = np.maximum(1, np.ceil((bounds[:, 1] - bounds[:, 0]) / spacing)).astype(int)
+    axes = [
+        lower + spacing * (np.arange(count) + 0.5)
+        for lower, count in zip(bounds[:, 0], counts)
+    ]
+    centers = np.stack(np.meshgrid(*axes, indexing="ij"), axis=-1).reshape(-1, 3)
+    enclosed = pv.PolyData(centers).select_enclosed_points(mesh, check_surface=False)
+    centers = centers[enclosed["SelectedPoints"].astype(bool)]
+    corners = np.array(list(itertools.product((-0.5, 0.5), repeat=3))) * spacing
+    return centers[:, np.newaxis] + corners
+
+
+def FitSpheres(
+    pieces: list[np.ndarray],
+    n_spheres: int,
+    padding: float = 0.0,
+    iterations: int = 30,
+    max_points: int = 4000,
+    seed: int = 0,
+) -> VecN:
+    """Covers convex pieces with spheres by clustering their centroids with k-means.
+    Each sphere is centered on its cluster and just large enough to contain every
+    corner of its pieces, and so the whole pieces.
+
+    Args:
+        pieces (list[np.ndarray]): (M, K, 3) corners of convex pieces to cover, such as
+            triangles or cells. Arrays may differ in their number of corners K.
+        n_spheres (int): Maximum number of spheres.
+        padding (float, optional): Distance added to every radius. Defaults to 0.0.
+        iterations (int, optional): Number of k-means iterations. Defaults to 30.
+        max_points (int, optional): Largest number of centroids clustered, the rest
+            are only assigned to the final clusters. Defaults to 4000.
+        seed (int, optional): Seed of the k-means initialization. Defaults to 0.
+
+    Returns:
+        VecN: (K, 4) sphere centers and radii, with K <= n_spheres.
+    """
+    rng = np.random.default_rng(seed)
+    centroids = np.concatenate([np.mean(corners, axis=1) for corners in pieces])
+    n_spheres = max(1, min(n_spheres, len(centroids)))
+
+    # cluster a subset of the centroids, then assign all of them
+    points = (
+        centroids
+        if len(centroids) <= max_points
+        else centroids[rng.choice(len(centroids), max_points, replace=False)]
+    )
+
+    # k-means++ initialization spreads the first centers over the points
+    centers = [points[rng.integers(len(points))]]
+    for _ in range(1, n_spheres):
+        distances = np.min(
+            np.linalg.norm(points[:, np.newaxis] - np.array(centers), axis=2), axis=1
+        )
+        if distances.max() <= 0.0:
+            break
+        centers.append(
+            points[rng.choice(len(points), p=distances**2 / np.sum(distances**2))]
+        )
+    centers = np.array(centers)
+
+    for _ in range(iterations):
+        labels = np.argmin(
+            np.linalg.norm(points[:, np.newaxis] - centers, axis=2), axis=1
+        )
+        updated = np.array(
+            [
+                points[labels == i].mean(axis=0) if np.any(labels == i) else centers[i]
+                for i in range(len(centers))
+            ]
+        )
+        if np.allclose(updated, centers):
+            break
+        centers = updated
+
+    # grow each sphere over the corners of its pieces, dropping empty clusters
+    labels = np.argmin(
+        np.linalg.norm(centroids[:, np.newaxis] - centers, axis=2), axis=1
+    )
+    radii = np.full(len(centers), -np.inf)
+    offset = 0
+    for corners in pieces:
+        members = labels[offset : offset + len(corners)]
+        reach = np.max(
+            np.linalg.norm(corners - centers[members, np.newaxis], axis=2), axis=1
+        )
+        np.maximum.at(radii, members, reach)
+        offset += len(corners)
+    used = np.isfinite(radii)
+    return np.column_stack([centers[used], radii[used] + padding])
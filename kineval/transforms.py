@@ -0,0 +1,116 @@
+from kineval import Vec, Vec3, VecN, Mat3, Mat4, Mat3N, Mat4N
+import numpy as np
+import math
+
+
+def AxisAngleMatrix(axis: Vec3, theta: float) -> Mat3:
+    """Computes the rotation matrix for a rotation of `theta` about `axis` in closed
+    form.
+
+    Args:
+        axis (Vec3): Rotation axis. Need not be normalized.
+        theta (float): Rotation angle (in radians).
+
+    Returns:
+        Mat3: The rotation matrix.
+    """
+    x, y, z = axis
+    norm = math.sqrt(x * x + y * y + z * z)
+    x, y, z = x / norm, y / norm, z / norm
+    c, s = math.cos(theta), math.sin(theta)
+    t = 1.0 - c
+    return np.array(
+        [
+            [t * x * x + c, t * x * y - s * z, t * x * z + s * y],
+            [t * x * y + s * z, t * y * y + c, t * y * z - s * x],
+            [t * x * z - s * y, t * y * z + s * x, t * z * z + c],
+        ]
+    )
+
+
+def EulerTransform(xyz: Vec3, rpy: Vec3) -> Mat4:
+    """Builds the homogeneous transform for a translation and an intrinsic XYZ euler
+    rotation, matching `R.from_euler("XYZ", rpy)`.
+
+    Args:
+        xyz (Vec3): xyz translation vector.
+        rpy (Vec3): Rotation angles (in radians) about the xyz axes.
+
+    Returns:
+        Mat4: The homogeneous transform.
+    """
+    cr, sr = math.cos(rpy[0]), math.sin(rpy[0])
+    cp, sp = math.cos(rpy[1]), math.sin(rpy[1])
+    cy, sy = math.cos(rpy[2]), math.sin(rpy[2])
+    return np.array(
+        [
+            [cp * cy, -cp * sy, sp, xyz[0]],
+            [cr * sy + sr * sp * cy, cr * cy - sr * sp * sy, -sr * cp, xyz[1]],
+            [sr * sy - cr * sp * cy, sr * cy + cr * sp * sy, cr * cp, xyz[2]],
+            [0.0, 0.0, 0.0, 1.0],
+        ]
+    )
+
+
+def SkewMatrices(vectors: VecN) -> Mat3N:
+    """Builds the cross product (skew-symmetric) matrix of each vector.
+
+    Args:
+        vectors (VecN): Array of vectors with shape (..., 3).
+
+    Returns:
+        Mat3N: Array of skew-symmetric matrices with shape (..., 3, 3).
+    """
+    x, y, z = vectors[..., 0], vectors[..., 1], vectors[..., 2]
+    zero = np.zeros_like(x)
+    return np.stack(
+        [
+            np.stack([zero, -z, y], axis=-1),
+            np.stack([z, zero, -x], axis=-1),
+            np.stack([-y, x, zero], axis=-1),
+        ],
+        axis=-2,
+    )
+
+
+def AxisAngleMatrices(axes: VecN, thetas: Vec) -> Mat3N:
+    """Computes rotation matrices for rotations of `thetas` about `axes` using
+    Rodrigues' formula. `axes` and `thetas` are broadcast against each other, so a
+    (J, 3) array of axes and an (N, J) array of angles gives (N, J, 3, 3) matrices.
+
+    Args:
+        axes (VecN): Rotation axes with shape (..., 3). Need not be normalized.
+        thetas (Vec): Rotation angles (in radians) with shape (...).
+
+    Returns:
+        Mat3N: Rotation matrices with shape (..., 3, 3).
+    """
+    axes = np.asarray(axes, float)
+    axes = axes / np.linalg.norm(axes, axis=-1, keepdims=True)
+    skew = SkewMatrices(axes)
+    skew2 = skew @ skew
+    thetas = np.asarray(thetas, float)[..., np.newaxis, np.newaxis]
+    return np.identity(3) + np.sin(thetas) * skew + (1 - np.cos(thetas)) * skew2
+
+
+def YawTransforms(xy: VecN, yaw: Vec) -> Mat4N:
+    """Builds homogeneous transforms for poses on the ground plane, rotated about the
+    z axis and translated along x and y.
+
+    Args:
+        xy (VecN): xy translations with shape (N, 2).
+        yaw (Vec): z axis rotations (in radians) with shape (N,).
+
+    Returns:
+        Mat4N: The homogeneous transforms with shape (N, 4, 4).
+    """
+    cos, sin = np.cos(yaw), np.sin(yaw)
+    transforms = np.zeros((len(yaw), 4, 4), float)
+    transforms[:, 0, 0] = cos
+    transforms[:, 0, 1] = -sin
+    transforms[:, 1, 0] = sin
+    transforms[:, 1, 1] = cos
+    transforms[:, 2, 2] = 1.0
+    transforms[:, 3, 3] = 1.0
+    transforms[:, 0:2, 3] = xy
+    return transforms
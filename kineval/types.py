@@ -1,10 +1,17 @@
-from nptyping import NDArray, Shape, Float
+from nptyping import NDArray, Shape, Float, Int, Bool
 
 Vec = NDArray[Shape["N"], Float]  # (N,) vector
 Vec2 = NDArray[Shape["2"], Float]  # (2,) vector
 Vec3 = NDArray[Shape["3"], Float]  # (3,) vector
 Vec4 = NDArray[Shape["4"], Float]  # (4,) vector
+IntVec = NDArray[Shape["N"], Int]  # (N,) vector of integers
+BoolVec = NDArray[Shape["N"], Bool]  # (N,) vector of booleans
 
 Mat2 = NDArray[Shape["2, 2"], Float]  # (2, 2) matrix
 Mat3 = NDArray[Shape["3, 3"], Float]  # (3, 3) matrix
 Mat4 = NDArray[Shape["4, 4"], Float]  # (4, 4) matrix
+
+VecN = NDArray[Shape["N, M"], Float]  # (N, M) array of N vectors
+Mat3N = NDArray[Shape["N, 3, 3"], Float]  # (N, 3, 3) array of N matrices
+Mat4N = NDArray[Shape["N, 4, 4"], Float]  # (N, 4, 4) array of N matrices
+Mat4NJ = NDArray[Shape["N, J, 4, 4"], Float]  # (N, J, 4, 4) array of N matrix stacks
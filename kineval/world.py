@@ -1,5 +1,9 @@
-from kineval import Plane, Vec4, Vec3, Vec2, Mat2, Sphere
-from pyvistaqt import QtInteractor
+from kineval import Plane, Vec, Vec4, Vec3, Vec2, VecN, Mat2, IntVec, Sphere, Robot
+from scipy.spatial import cKDTree
+from collections import OrderedDict
+from vtkmodules.vtkCommonCore import vtkPoints, vtkIdTypeArray, VTK_ID_TYPE
+from vtkmodules.vtkCommonDataModel import vtkCellArray
+from vtkmodules.util.numpy_support import numpy_to_vtk, vtk_to_numpy
 import numpy as np
 import pyvista as pv
 
@@ -7,38 +11,432 @@ import pyvista as pv
 class Obstacle:
     """A basic definition of a spherical obstacle."""
 
+    revision: int = 0  # number of edits to any obstacle, so worlds can detect them
+
     def __init__(self, origin: Vec3, radius: float):
         # structure
-        self.origin: Vec3 = np.array(origin, float)  # center of obstalce
+        self.origin: Vec3 = origin  # center of obstalce
         self.radius: float = radius  # radius of obstacle
+        self.geom: pv.Actor = Sphere(origin, radius)  # rendered geometry of obstacle
+
+    def __getstate__(self) -> dict:
+        """Drops the rendered geometry, so the obstacle can be pickled as pure data."""
+        state = self.__dict__.copy()
+        state["geom"] = None
+        return state
+
+    @property
+    def origin(self) -> Vec3:
+        """Vec3: Center of the obstacle. Reassigning it marks the obstacle arrays of
+        every world as stale."""
+        return self._origin
+
+    @origin.setter
+    def origin(self, origin: Vec3):
+        self._origin = np.array(origin, float)
         self.origin_homogeneous: Vec4 = np.array(
-            [*origin, 1], float
+            [*self._origin, 1], float
         )  # homogeneous obstacle center
-        self.geom: pv.Actor = Sphere(origin, radius)  # rendered geometry of obstacle
+        Obstacle.revision += 1
+
+    @property
+    def radius(self) -> float:
+        """float: Radius of the obstacle. Reassigning it marks the obstacle arrays of
+        every world as stale."""
+        return self._radius
+
+    @radius.setter
+    def radius(self, radius: float):
+        self._radius = radius
+        Obstacle.revision += 1
+
+
+class ObstacleList(list):
+    """A list of obstacles that counts its modifications, so the world holding it can
+    tell when its obstacle arrays are stale."""
+
+    def __init__(self, obstacles: list[Obstacle] = ()):
+        super().__init__(obstacles)
+        self.version: int = 0  # number of modifications of the list
+
+    def __reduce__(self) -> tuple:
+        """Pickles the obstacles as a plain list, since unpickling a list subclass
+        extends it before its attributes are restored."""
+        return ObstacleList, (list(self),), self.__dict__
+
+    def __setitem__(self, index, value):
+        super().__setitem__(index, value)
+        self.version += 1
+
+    def __delitem__(self, index):
+        super().__delitem__(index)
+        self.version += 1
+
+    def __iadd__(self, obstacles):
+        self.version += 1
+        return super().__iadd__(obstacles)
+
+    def __imul__(self, count):
+        self.version += 1
+        return super().__imul__(count)
+
+    def append(self, obstacle: Obstacle):
+        super().append(obstacle)
+        self.version += 1
+
+    def extend(self, obstacles):
+        super().extend(obstacles)
+        self.version += 1
+
+    def insert(self, index, obstacle: Obstacle):
+        super().insert(index, obstacle)
+        self.version += 1
+
+    def remove(self, obstacle: Obstacle):
+        super().remove(obstacle)
+        self.version += 1
+
+    def pop(self, index=-1) -> Obstacle:
+        self.version += 1
+        return super().pop(index)
+
+    def clear(self):
+        super().clear()
+        self.version += 1
+
+    def sort(self, *args, **kwargs):
+        super().sort(*args, **kwargs)
+        self.version += 1
 
+    def reverse(self):
+        super().reverse()
+        self.version += 1
 
-class Marker:
-    """An object to mark a robot configuration in the world."""
 
-    def __init__(self, origin: Vec3):
+class MarkerCloud:
+    """A growing set of markers and line segments, drawn with one point actor and one
+    line actor so drawing cost does not depend on the number of markers."""
+
+    def __init__(self, point_size: float = 10.0, line_width: float = 2.0):
         # structure
-        self.origin: Vec3 = np.array(origin)  # position of marker
+        self.markers: MarkerBuffer = MarkerBuffer(1)  # one vertex per marker
+        self.segments: MarkerBuffer = MarkerBuffer(
+            2
+        )  # one line per start and end, in consecutive rows
         # visual
-        self.geom: pv.Actor = Sphere(self.origin, 0.05)
+        self.point_geom: pv.Actor = pv.Actor(
+            mapper=pv.DataSetMapper(self.markers.data)
+        )  # rendered geometry of markers
+        self.point_geom.prop.SetRenderPointsAsSpheres(True)
+        self.point_geom.prop.SetPointSize(point_size)
+        self.line_geom: pv.Actor = pv.Actor(
+            mapper=pv.DataSetMapper(self.segments.data)
+        )  # rendered geometry of segments
+        self.line_geom.prop.SetLineWidth(line_width)
+        for geom in (self.point_geom, self.line_geom):
+            geom.mapper.SetScalarModeToUsePointFieldData()
+            geom.mapper.SelectColorArray("colors")
+            geom.mapper.SetColorModeToDirectScalars()
+
+    def addPoints(self, points: VecN, color: Vec3 = (1.0, 1.0, 0.0)) -> IntVec:
+        """Adds markers.
+
+        Args:
+            points (VecN): (N, 3) marker positions.
+            color (Vec3, optional): rgb of the markers. Defaults to yellow.
+
+        Returns:
+            IntVec: Indices of the added markers, for `setColor`.
+        """
+        points = np.asarray(points, float).reshape(-1, 3)
+        start = self.markers.size
+        self.markers.add(points, color)
+        return np.arange(start, self.markers.size)
+
+    def addSegments(self, starts: VecN, ends: VecN, color: Vec3 = (1.0, 1.0, 0.0)):
+        """Adds line segments.
+
+        Args:
+            starts (VecN): (N, 3) start of each segment.
+            ends (VecN): (N, 3) end of each segment.
+            color (Vec3, optional): rgb of the segments. Defaults to yellow.
+        """
+        starts = np.asarray(starts, float).reshape(-1, 3)
+        ends = np.asarray(ends, float).reshape(-1, 3)
+        self.segments.add(np.stack([starts, ends], axis=1).reshape(-1, 3), color)
+
+    def setColor(self, indices: IntVec, color: Vec3):
+        """Changes the color of markers.
+
+        Args:
+            indices (IntVec): Indices of the markers, from `addPoints`.
+            color (Vec3): New rgb of the markers.
+        """
+        self.markers.colors[indices] = np.multiply(color, 255)
+        self.markers.dirty = True
+
+    def clear(self):
+        """Removes all markers and segments."""
+        self.markers.clear()
+        self.segments.clear()
+
+    def update(self):
+        """Updates the rendered geometries if markers or segments changed. Empty
+        geometries are hidden."""
+        self.markers.update()
+        self.segments.update()
+        self.point_geom.SetVisibility(self.markers.size > 0)
+        self.line_geom.SetVisibility(self.segments.size > 0)
+
+
+class MarkerBuffer:
+    """Positions and colors of rendered points, stored in arrays that the rendered
+    geometry shares instead of copies. Adding points writes into spare rows, so an
+    update only changes the number of drawn rows, and the geometry is only rebuilt when
+    the arrays grow."""
+
+    def __init__(self, cell_size: int, capacity: int = 256):
+        """Creates an empty buffer.
+
+        Args:
+            cell_size (int): Number of consecutive points per cell, 1 for vertices and 2
+                for line segments.
+            capacity (int, optional): Initial number of rows. Defaults to 256.
+        """
+        self.cell_size: int = cell_size
+        self.positions: VecN = np.zeros((capacity, 3), float)  # point positions
+        self.colors: np.ndarray = np.zeros(
+            (capacity, 3), np.uint8
+        )  # rgb of each point, 0 to 255
+        self.size: int = 0  # number of points
+        self.dirty: bool = False  # whether the geometry is out of date
+        self.data: pv.PolyData = pv.PolyData()  # rendered geometry
+        self.cells: vtkCellArray = vtkCellArray()  # vertices or lines of the geometry
+        if cell_size == 1:
+            self.data.SetVerts(self.cells)
+        else:
+            self.data.SetLines(self.cells)
+        self.connectivity: vtkIdTypeArray | None = (
+            None  # point index of each cell corner, shared with the geometry
+        )
+        self.offsets: vtkIdTypeArray | None = (
+            None  # start of each cell in the connectivity, shared with the geometry
+        )
+        self.shared: bool = False  # whether the geometry uses the current arrays
 
-    def setColor(self, color: Vec3):
-        self.geom.prop.SetColor(*color)
+    def add(self, positions: VecN, color: Vec3):
+        """Adds points of one color.
+
+        Args:
+            positions (VecN): (N, 3) point positions.
+            color (Vec3): rgb of the points, 0 to 1.
+        """
+        size = self.size + len(positions)
+        if size > len(self.positions):
+            self.positions = Reserve(self.positions, size)
+            self.colors = Reserve(self.colors, size)
+            self.shared = False
+        self.positions[self.size : size] = positions
+        self.colors[self.size : size] = np.multiply(color, 255)
+        self.size = size
+        self.dirty = True
+
+    def clear(self):
+        """Removes all points."""
+        self.size = 0
+        self.dirty = True
+
+    def update(self):
+        """Shows the current points in the rendered geometry. An empty buffer leaves
+        the geometry as is, since resizing the shared arrays to nothing makes VTK
+        release them, so the owner should hide it instead."""
+        if not self.dirty or self.size == 0:
+            return
+        if not self.shared:
+            self.share()
+        self.resize()
+        if not self.sharesMemory():
+            # VTK reallocated an array, so the geometry no longer reads the buffer
+            self.share()
+            self.resize()
+        self.data.GetPoints().Modified()
+        self.data.GetPointData().GetArray("colors").Modified()
+        self.data.Modified()
+        self.dirty = False
+
+    def share(self):
+        """Points the geometry at the current arrays, including their spare rows."""
+        capacity = len(self.positions)
+        points = vtkPoints()
+        points.SetData(numpy_to_vtk(self.positions, deep=False))
+        self.data.SetPoints(points)
+        colors = numpy_to_vtk(self.colors, deep=False)
+        colors.SetName("colors")
+        self.data.GetPointData().AddArray(colors)
+        self.connectivity = numpy_to_vtk(
+            np.arange(capacity, dtype=np.int64),
+            deep=False,
+            array_type=VTK_ID_TYPE,
+        )
+        self.offsets = numpy_to_vtk(
+            np.arange(0, capacity + 1, self.cell_size, dtype=np.int64),
+            deep=False,
+            array_type=VTK_ID_TYPE,
+        )
+        self.shared = True
+
+    def resize(self):
+        """Makes the geometry draw only the rows in use."""
+        self.data.GetPoints().GetData().SetNumberOfTuples(self.size)
+        self.data.GetPointData().GetArray("colors").SetNumberOfTuples(self.size)
+        self.connectivity.SetNumberOfTuples(self.size)
+        self.offsets.SetNumberOfTuples(self.size // self.cell_size + 1)
+        self.cells.SetData(self.offsets, self.connectivity)
+
+    def sharesMemory(self) -> bool:
+        """Returns whether the geometry still reads the point positions and colors from
+        the buffer arrays.
+
+        Returns:
+            bool: Whether the rendered arrays share memory with the buffer.
+        """
+        points = vtk_to_numpy(self.data.GetPoints().GetData())
+        colors = vtk_to_numpy(self.data.GetPointData().GetArray("colors"))
+        return np.shares_memory(points, self.positions) and np.shares_memory(
+            colors, self.colors
+        )
+
+
+def Reserve(array: np.ndarray, size: int) -> np.ndarray:
+    """Grows an array along its first axis, doubling its length, until it holds at
+    least `size` rows.
+
+    Args:
+        array (np.ndarray): Array to grow.
+        size (int): Number of rows needed.
+
+    Returns:
+        np.ndarray: The array, or a larger copy of it.
+    """
+    if size <= len(array):
+        return array
+    length = max(1, len(array))
+    while length < size:
+        length *= 2
+    grown = np.zeros((length, *array.shape[1:]), array.dtype)
+    grown[: len(array)] = array
+    return grown
+
+
+class CollisionCache:
+    """A bounded LRU cache of collision results. Configurations are quantized to a grid
+    of `resolution`, so configurations closer than the resolution share a result.
+    Results are keyed by the robot's collision settings too, so changing them does not
+    reuse results computed under other settings."""
+
+    def __init__(self, resolution: float = 1e-3, capacity: int = 100000):
+        self.resolution: float = resolution  # quantization step of configurations
+        self.capacity: int = capacity  # maximum number of stored results
+        self.entries: OrderedDict[tuple, bool] = (
+            OrderedDict()
+        )  # results from least to most recently used
+        self.hits: int = 0  # number of lookups that found a result
+        self.misses: int = 0  # number of lookups that found no result
+
+    def keys(self, robot: Robot, configurations: VecN) -> list[tuple]:
+        """Returns the cache keys of configuration vectors.
+
+        Args:
+            robot (Robot): Robot in the configurations. Its name, whether self
+                collision is checked, its allowed collisions and which links have
+                spheres are part of the key.
+            configurations (VecN): Configuration vector or (N, dof) array of vectors.
+
+        Returns:
+            list[tuple]: The key of each quantized configuration.
+        """
+        settings = (
+            robot.name,
+            robot.self_collision,
+            (
+                robot.allowed_collisions.tobytes()
+                if robot.self_collision and robot.allowed_collisions is not None
+                else None
+            ),
+            bytes(link.spheres is not None for link in robot.links),
+        )  # collision settings the results depend on
+        cells = np.round(
+            np.atleast_2d(np.asarray(configurations, float)) / self.resolution
+        )
+        return [(settings, cell.tobytes()) for cell in cells.astype(np.int64)]
+
+    def get(self, key: tuple) -> bool | None:
+        """Looks up a result and marks it as recently used.
+
+        Args:
+            key (tuple): Key from `keys`.
+
+        Returns:
+            bool | None: Whether the configuration is in collision, or None if the
+                result is not cached.
+        """
+        collided = self.entries.get(key)
+        if collided is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self.entries.move_to_end(key)
+        return collided
+
+    def put(self, key: tuple, collided: bool):
+        """Stores a result, evicting the least recently used result when full.
+
+        Args:
+            key (tuple): Key from `keys`.
+            collided (bool): Whether the configuration is in collision.
+        """
+        self.entries[key] = bool(collided)
+        self.entries.move_to_end(key)
+        if len(self.entries) > self.capacity:
+            self.entries.popitem(last=False)
+
+    def clear(self):
+        """Removes every stored result and resets the counters."""
+        self.entries.clear()
+        self.hits = 0
+        self.misses = 0
 
 
 class World:
     """A class for holding all the obstacles, terrain, etc. that are in the world."""
 
-    def __init__(self, name: str, obstacles: list[Obstacle] = None, size: Vec2 = None):
+    def __init__(
+        self,
+        name: str,
+        obstacles: list[Obstacle] = None,
+        size: Vec2 = None,
+        index_threshold: int = 512,
+        collision_cache: CollisionCache | None = None,
+    ):
         self.name: str = name  # name of world
+        self.collision_cache: CollisionCache | None = (
+            collision_cache  # cached collision results, cleared when obstacles change
+        )
+        self._obstacle_origins: VecN = np.zeros(
+            (0, 3), float
+        )  # (M, 3) obstacle centers
+        self._obstacle_radii: Vec = np.zeros((0), float)  # (M,) obstacle radii
+        self._obstacle_tree: cKDTree | None = None  # spatial index of obstacle centers
+        self._obstacles_built: tuple[int, int] | None = (
+            None  # list version and obstacle revision the arrays were built from
+        )
+        self.index_threshold: int = (
+            index_threshold  # minimum obstacles before the spatial index is used
+        )
         self.obstacles: list[Obstacle] = (
             [] if obstacles is None else obstacles
         )  # list of obstacles
-        self.markers: list[Marker] = []  # list of markers
+        self.markers: MarkerCloud = MarkerCloud()  # markers drawn in the world
         self.size: Vec2 = (
             np.array([10.0, 10.0], float) if size is None else np.array(size, float)
         )  # x and y length of the world
@@ -52,31 +450,125 @@ class World:
             origin=[0.0, 0.0, -0.01], normal=[0.0, 0.0, 1.0], size=self.size
         )  # terrain geometry
 
-    def addMarker(self, origin: Vec3, plotter: QtInteractor) -> Marker:
-        """Adds a new marker to the scene and world.
+    def __getstate__(self) -> dict:
+        """Drops the terrain and markers, so the world can be pickled as pure data."""
+        state = self.__dict__.copy()
+        state["markers"] = None
+        state["terrain"] = None
+        state["_obstacles_built"] = None  # obstacle revisions are per process
+        return state
+
+    @property
+    def obstacles(self) -> ObstacleList:
+        """ObstacleList: Obstacles in the world. Assigning a list copies it into an
+        `ObstacleList`. Modifying the list, or reassigning the origin or radius of an
+        obstacle, rebuilds the obstacle arrays on their next use."""
+        return self._obstacles
+
+    @obstacles.setter
+    def obstacles(self, obstacles: list[Obstacle]):
+        self._obstacles = ObstacleList(obstacles)
+        self.updateObstacles()
+
+    @property
+    def obstacle_origins(self) -> VecN:
+        """VecN: (M, 3) obstacle centers, in the order of `obstacles`."""
+        self.refreshObstacles()
+        return self._obstacle_origins
+
+    @property
+    def obstacle_radii(self) -> Vec:
+        """Vec: (M,) obstacle radii, in the order of `obstacles`."""
+        self.refreshObstacles()
+        return self._obstacle_radii
+
+    @property
+    def obstacle_tree(self) -> cKDTree | None:
+        """cKDTree | None: Spatial index of obstacle centers, or None if there are
+        fewer than `index_threshold` obstacles."""
+        self.refreshObstacles()
+        return self._obstacle_tree
+
+    def refreshObstacles(self):
+        """Rebuilds the obstacle arrays if the obstacles changed since they were
+        built."""
+        if self._obstacles_built != (self._obstacles.version, Obstacle.revision):
+            self.updateObstacles()
+
+    def updateObstacles(self):
+        """Rebuilds `obstacle_origins`, `obstacle_radii` and the spatial index from
+        `obstacles`, and clears the collision cache."""
+        self._obstacle_origins = np.array(
+            [obstacle.origin for obstacle in self._obstacles], float
+        ).reshape(-1, 3)
+        self._obstacle_radii = np.array(
+            [obstacle.radius for obstacle in self._obstacles], float
+        )
+        self._obstacle_tree = (
+            cKDTree(self._obstacle_origins)
+            if len(self._obstacles) >= self.index_threshold
+            else None
+        )
+        self._obstacles_built = (self._obstacles.version, Obstacle.revision)
+        if self.collision_cache is not None:
+            self.collision_cache.clear()
+
+    def queryObstacles(
+        self, center: Vec3, radius: float, candidates: IntVec | None = None
+    ) -> IntVec:
+        """Finds the obstacles that intersect a sphere.
 
         Args:
-            origin (Vec3): Position of marker.
-            plotter (QtInteractor): Plotter of main window.
+            center (Vec3): Center of the query sphere.
+            radius (float): Radius of the query sphere.
+            candidates (IntVec | None, optional): Obstacle indices to search within.
+                Defaults to None (search all obstacles, using the spatial index if
+                there is one).
 
         Returns:
-            Marker: The newly added marker.
+            IntVec: Index into `obstacle_origins` and `obstacle_radii` of the obstacles
+                intersecting the sphere.
         """
-        marker = Marker(origin)
-        marker.setColor([1.0, 1.0, 0.0])
-        self.markers.append(marker)
-        plotter.add_actor(marker.geom)
-        return marker
+        self.refreshObstacles()
+        if candidates is None and self._obstacle_tree is not None:
+            candidates = np.array(
+                self._obstacle_tree.query_ball_point(
+                    center, radius + self._obstacle_radii.max()
+                ),
+                int,
+            )
+        elif candidates is None:
+            candidates = np.arange(len(self._obstacle_radii))
+        difference = self._obstacle_origins[candidates] - center
+        limit = radius + self._obstacle_radii[candidates]
+        distances = np.einsum("ij,ij->i", difference, difference)
+        return candidates[distances <= limit * limit]
 
-    def clearMarkers(self, plotter: QtInteractor):
-        """Removes all markers from the scene and the world.
+    def queryObstaclePairs(self, centers: VecN, radius: float) -> tuple[IntVec, IntVec]:
+        """Finds the obstacles that intersect each of many equally sized spheres.
 
         Args:
-            plotter (QtInteractor): Plotter of the main window.
-        """
-        # remove geometries from plotter
-        for marker in self.markers:
-            plotter.remove_actor(marker.geom)
+            centers (VecN): (N, 3) array of sphere centers.
+            radius (float): Radius of every sphere.
 
-        # reset markers
-        self.markers = []
+        Returns:
+            tuple[IntVec, IntVec]: Sphere index and obstacle index of each intersecting
+                pair.
+        """
+        self.refreshObstacles()
+        if self._obstacle_tree is not None:
+            hits = self._obstacle_tree.query_ball_point(
+                centers, radius + self._obstacle_radii.max()
+            )
+            spheres = np.repeat(np.arange(len(centers)), [len(hit) for hit in hits])
+            obstacles = np.fromiter(
+                (i for hit in hits for i in hit), int, count=len(spheres)
+            )
+        else:
+            spheres, obstacles = np.indices((len(centers), len(self._obstacle_radii)))
+            spheres, obstacles = spheres.ravel(), obstacles.ravel()
+        difference = self._obstacle_origins[obstacles] - centers[spheres]
+        limit = radius + self._obstacle_radii[obstacles]
+        distances = np.einsum("ij,ij->i", difference, difference)
+        keep = distances <= limit * limit
+        return spheres[keep], obstacles[keep]
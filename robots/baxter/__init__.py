@@ -1,5 +1,5 @@
 from robots.urdf_loader import FromURDF
 
-robot = FromURDF("robots/baxter/baxter.urdf")
+robot = FromURDF("robots/baxter/baxter.urdf", collision_spheres=8)
 robot.selected = robot.joints[5]  # right_s0
 robot.endeffector = robot.links[10]  # right_wrist
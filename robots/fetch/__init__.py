@@ -1,5 +1,5 @@
 from robots.urdf_loader import FromURDF
 
-robot = FromURDF("robots/fetch/fetch.urdf")
+robot = FromURDF("robots/fetch/fetch.urdf", collision_spheres=8)
 robot.selected = robot.joints[5]  # shoulder_pan_joint
 robot.endeffector = robot.links[14]  # r_gripper_finger_link
@@ -57,7 +57,7 @@ for i in range(8):
 robot = Robot(
     name="crawler",
     base=link_base,
-    endeffector=joints[2],
+    endeffector=link_legs[2],
     links=links,
     joints=joints,
 )
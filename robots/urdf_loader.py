@@ -1,15 +1,22 @@
-from kineval import Robot, Link, Joint, Sphere
+from kineval import Robot, Link, Joint, Sphere, FitRobotSpheres
 from scipy.spatial.transform import Rotation as R
 import urchin
 import trimesh
 import pyvista as pv
 
 
-def FromURDF(urdf_filename: str) -> Robot:
+def FromURDF(
+    urdf_filename: str, collision_spheres: int = 0, self_collision: bool = False
+) -> Robot:
     """Creates a Robot from a urdf file.
 
     Args:
         urdf_filename (str): File to load from.
+        collision_spheres (int, optional): Number of spheres to fit to each link mesh
+            for tighter collision checks, or 0 to only use bounding boxes. Defaults to
+            0.
+        self_collision (bool, optional): Whether links are checked against each other.
+            Defaults to False.
 
     Returns:
         Robot: The generated robot.
@@ -62,10 +69,14 @@ def FromURDF(urdf_filename: str) -> Robot:
                 )
             )
 
-    return Robot(
+    robot = Robot(
         name=urdf_robot.name,
         base=link_names[urdf_robot.base_link.name],
         endeffector=link_names[urdf_robot.end_links[0].name],
         links=list(link_names.values()),
         joints=joints,
     )
+    robot.self_collision = self_collision
+    if collision_spheres > 0:
+        FitRobotSpheres(robot, collision_spheres)
+    return robot